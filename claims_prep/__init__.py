@@ -7,17 +7,35 @@ Expose a compact public API so callers can do:
 Keep imports minimal here to avoid heavy startup cost or side effects.
 """
 
-from .io import load_csv, save_csv, preview_df
+from .io import load_csv, save_csv, preview_df, iter_csv_chunks, find_csv_files, resolve_csv_engine
 from .cleaning import (
     clean_column_names,
     infer_and_parse_dates,
     downcast_numeric,
+    detect_low_cardinality_columns,
+    categorize_low_cardinality,
     detect_amount_column,
     detect_id_columns,
+    detect_claim_id_columns,
 )
+from .output import DatasetWriter, save_dataset
 from .features import create_fraud_features, deidentify_ids
 from .examples import summarize_claims, example_filters
 from .db import create_sqlite_db_from_dir, read_table, list_db_tables, csv_to_table
+from .sketches import (
+    MomentsAccumulator,
+    GroupedMoments,
+    QuantileSketch,
+    ClaimsSummary,
+    summarize_chunks,
+    load_summaries,
+    save_summaries,
+)
+from .db import iter_table_chunks
+from .sqlutil import connect_db
+from .rollups import update_rollups, reset_rollups, find_rollup
+from .dedupe import ClaimDeduper, BloomFilter
+from .service import FeatureService, build_feature_tables, serve
 from .demo import demo_create_and_preview
 from .db import create_sqlite_databases_for_data_root
 
@@ -25,11 +43,19 @@ __all__ = [
     "load_csv",
     "save_csv",
     "preview_df",
+    "iter_csv_chunks",
+    "find_csv_files",
+    "resolve_csv_engine",
+    "DatasetWriter",
+    "save_dataset",
     "clean_column_names",
     "infer_and_parse_dates",
     "downcast_numeric",
+    "detect_low_cardinality_columns",
+    "categorize_low_cardinality",
     "detect_amount_column",
     "detect_id_columns",
+    "detect_claim_id_columns",
     "create_fraud_features",
     "deidentify_ids",
     "summarize_claims",
@@ -38,6 +64,23 @@ __all__ = [
     "read_table",
     "list_db_tables",
     "csv_to_table",
+    "iter_table_chunks",
+    "connect_db",
+    "MomentsAccumulator",
+    "GroupedMoments",
+    "QuantileSketch",
+    "ClaimsSummary",
+    "summarize_chunks",
+    "load_summaries",
+    "save_summaries",
+    "update_rollups",
+    "reset_rollups",
+    "find_rollup",
+    "ClaimDeduper",
+    "BloomFilter",
+    "FeatureService",
+    "build_feature_tables",
+    "serve",
     "demo_create_and_preview",
     "create_sqlite_databases_for_data_root",
 ]
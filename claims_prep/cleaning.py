@@ -22,7 +22,7 @@ def infer_and_parse_dates(df: pd.DataFrame) -> pd.DataFrame:
     parsed = []
     for c in date_cols:
         try:
-            df[c] = pd.to_datetime(df[c], errors="coerce", infer_datetime_format=True)
+            df[c] = pd.to_datetime(df[c], errors="coerce")
             parsed.append(c)
         except Exception:
             logging.debug("Could not parse column as date: %s", c)
@@ -42,6 +42,37 @@ def downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def detect_low_cardinality_columns(df: pd.DataFrame, max_unique_ratio: float = 0.5, exclude=()) -> list:
+    """Return string-like columns whose distinct-value count is at most `max_unique_ratio` of the rows."""
+    n = len(df)
+    if n == 0:
+        return []
+    cols = []
+    for c in df.columns:
+        if c in exclude:
+            continue
+        if not (pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c])):
+            continue
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            continue
+        if df[c].nunique(dropna=True) <= max_unique_ratio * n:
+            cols.append(c)
+    return cols
+
+
+def categorize_low_cardinality(df: pd.DataFrame, max_unique_ratio: float = 0.5, exclude=()) -> pd.DataFrame:
+    """Convert low-cardinality string columns (codes, specialty, state, gender, repeated IDs) to `category`.
+
+    Each distinct string is then stored once with small integer codes per row, which cuts memory
+    for repeated values substantially.
+    """
+    cols = detect_low_cardinality_columns(df, max_unique_ratio=max_unique_ratio, exclude=exclude)
+    for c in cols:
+        df[c] = df[c].astype("category")
+    logging.info("Converted low-cardinality columns to category: %s", cols)
+    return df
+
+
 def detect_amount_column(df: pd.DataFrame):
     """Return a best-guess column name for monetary/amount columns, or None."""
     candidates = [c for c in df.columns if re.search(r"amount|charge|cost|paid|total", c)]
@@ -53,3 +84,11 @@ def detect_id_columns(df: pd.DataFrame):
     patient_cols = [c for c in df.columns if re.search(r"patient(_)?id|member(_)?id|pid|member", c)]
     provider_cols = [c for c in df.columns if re.search(r"provider(_)?id|provider", c)]
     return patient_cols, provider_cols
+
+
+def detect_claim_id_columns(df: pd.DataFrame):
+    """Detect likely claim identifier columns (claim_id, clm_id, claimid, ...).
+
+    Case-insensitive so raw CMS headers such as CLM_ID match without preprocessing.
+    """
+    return [c for c in df.columns if re.search(r"claim(_)?id|clm(_)?id", str(c), flags=re.IGNORECASE)]
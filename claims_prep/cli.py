@@ -1,12 +1,16 @@
 """Command-line interface wiring for the claims_prep package."""
 from pathlib import Path
 import argparse
+import asyncio
 import logging
 
-from .io import load_csv, save_csv, preview_df
-from .cleaning import clean_column_names, infer_and_parse_dates, downcast_numeric, detect_amount_column, detect_id_columns
+from .io import load_csv, save_csv, preview_df, CSV_ENGINES
+from .cleaning import (clean_column_names, infer_and_parse_dates, downcast_numeric, categorize_low_cardinality,
+                       detect_amount_column, detect_id_columns)
 from .features import create_fraud_features, deidentify_ids
 from .examples import summarize_claims, example_filters
+from .output import save_dataset, OUTPUT_FORMATS, PARTITION_KEYS
+from .service import build_feature_tables, discover_databases, serve, MAX_BODY_BYTES
 from .db import create_sqlite_db_from_dir, list_db_tables, read_table, create_sqlite_databases_for_data_root
 
 
@@ -14,35 +18,80 @@ def _configure_logging(level: int = logging.INFO):
     logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
 
 
+def _build_feature_tables(db_paths) -> None:
+    """Build feature tables in each DB; a failure is logged and does not stop the others."""
+    for db_path in db_paths:
+        try:
+            build_feature_tables(db_path)
+        except Exception:
+            logging.exception("Failed to build feature tables in %s", db_path)
+
+
 def main(argv: list = None) -> None:
     _configure_logging()
     p = argparse.ArgumentParser(description="Prepare healthcare claims CSV for downstream modeling (no ML model fitting).")
-    p.add_argument("--input", "-i", type=Path, required=False, help="Path to input CSV")
+    p.add_argument("--input", "-i", type=Path, required=False, help="Path to input CSV (.csv, .csv.gz, .csv.zst or .csv.bz2)")
     p.add_argument("--output", "-o", type=Path, default=Path("processed_claims.csv"), help="Where to save cleaned CSV")
     p.add_argument("--nrows", type=int, default=None, help="If set, read only nrows (useful for quick tests)")
     p.add_argument("--hash-ids", action="store_true", help="Hash detected ID columns to de-identify")
     p.add_argument("--id-salt", type=str, default="", help="Optional salt for deterministic hashing")
     p.add_argument("--compute-features", action="store_true", help="Create features useful for modeling (no model fitting)")
     p.add_argument("--features-output", type=Path, default=Path("claims_with_features.csv"), help="Where to save CSV with engineered features")
+    p.add_argument("--jobs", type=int, default=1, help="Processes for --compute-features; patient-level features run over shards hash-partitioned by patient ID (-1: all cores)")
+    p.add_argument("--output-format", choices=OUTPUT_FORMATS, default="csv", help="Format for --output/--features-output; a .csv suffix is swapped for the chosen format")
+    p.add_argument("--partition-by", choices=PARTITION_KEYS, default=None, help="Write outputs as a Hive-style partitioned directory keyed by claim month or provider")
     p.add_argument("--create-db", action="store_true", help="Create a sqlite DB from CSVs in a data dir and exit")
     p.add_argument("--data-dir", type=Path, default=Path("data"), help="Directory containing CSV files to ingest into sqlite")
     p.add_argument("--db-path", type=Path, default=None, help="Path for sqlite DB to create/use. If omitted when creating a single dataset DB, the path will be derived under --databases-dir")
     p.add_argument("--no-preprocess", action="store_true", help="Skip cleaning/typing while ingesting CSVs into sqlite")
     p.add_argument("--all-datasets", action="store_true", help="When used with --create-db: create one sqlite DB per dataset subdirectory under --data-dir and write them to --databases-dir")
+    p.add_argument("--build-sketches", action="store_true", help="When creating DBs, also persist mergeable streaming summaries (moments, quantile sketch) next to each DB")
+    p.add_argument("--build-rollups", action="store_true", help="When creating DBs, maintain per provider/patient/diagnosis/claim-month count/total/mean rollup tables")
+    p.add_argument("--dictionary-encode", action="store_true", help="When creating DBs, store low-cardinality string columns as integer codes with lookup tables and a decoding view")
+    p.add_argument("--dedupe", choices=("first", "latest"), default=None, help="When creating DBs, keep one row per claim ID across chunks/appends (keep the first or the latest occurrence)")
+    p.add_argument("--no-dedupe-prefilter", action="store_true", help="Disable the Bloom-filter prefilter used with --dedupe (every ID is then looked up in the unique index)")
+    p.add_argument("--no-categorize", action="store_true", help="Keep low-cardinality string columns as plain strings instead of pandas category")
+    p.add_argument("--build-feature-tables", action="store_true", help="When creating DBs, also materialize indexed per-patient/per-provider feature tables for --serve")
+    p.add_argument("--serve", action="store_true", help="Serve patient/provider feature lookups over HTTP from --db-path or every DB in --databases-dir and exit on Ctrl-C")
+    p.add_argument("--host", type=str, default="127.0.0.1", help="Host for --serve")
+    p.add_argument("--port", type=int, default=8080, help="Port for --serve")
+    p.add_argument("--pool-size", type=int, default=4, help="Read-only sqlite connections per dataset for --serve")
+    p.add_argument("--cache-size", type=int, default=100_000, help="Max cached feature vectors for --serve")
+    p.add_argument("--cache-ttl", type=float, default=300.0, help="Seconds a cached feature vector stays valid for --serve")
+    p.add_argument("--max-body-bytes", type=int, default=MAX_BODY_BYTES, help="Largest request body --serve accepts (batch lookups); larger requests get 413")
+    p.add_argument("--csv-engine", choices=CSV_ENGINES, default="auto", help="CSV parser: 'auto' uses pyarrow when installed (chunked ingestion parses large blocks with its multi-threaded reader, falling back to the C parser for files it cannot parse), else pandas' C parser")
     p.add_argument("--databases-dir", type=Path, default=Path("databases"), help="Directory to write per-dataset sqlite files when using --all-datasets")
 
     args = p.parse_args(argv)
 
-    # allow the --create-db flow to run without --input; require input for the normal processing path
-    if not args.create_db and args.input is None:
+    # allow the --create-db and --serve flows to run without --input; require input for the normal processing path
+    if not args.create_db and not args.serve and args.input is None:
         p.error("--input is required when not creating a DB")
 
+    if args.serve:
+        databases = {args.db_path.stem: args.db_path} if args.db_path else discover_databases(args.databases_dir)
+        if not databases:
+            p.error(f"No sqlite DBs found to serve (pass --db-path or populate {args.databases_dir})")
+        try:
+            asyncio.run(serve(databases, host=args.host, port=args.port, pool_size=args.pool_size,
+                              cache_size=args.cache_size, cache_ttl=args.cache_ttl,
+                              max_body_bytes=args.max_body_bytes))
+        except KeyboardInterrupt:
+            logging.info("Feature service stopped")
+        return
+
     # If user asked to create a DB, do that and exit early
     if args.create_db:
         try:
             if args.all_datasets:
-                created = create_sqlite_databases_for_data_root(args.data_dir, args.databases_dir, preprocess=not args.no_preprocess)
+                created = create_sqlite_databases_for_data_root(args.data_dir, args.databases_dir, preprocess=not args.no_preprocess,
+                                                                engine=args.csv_engine, build_sketches=args.build_sketches,
+                                                                build_rollups=args.build_rollups,
+                                                                dictionary_encode=args.dictionary_encode, dedupe=args.dedupe,
+                                                                dedupe_prefilter=not args.no_dedupe_prefilter)
                 logging.info("Created databases: %s", created)
+                if args.build_feature_tables:
+                    _build_feature_tables(created)
             else:
                 # Derive a sensible default db-path when none was provided: use databases/<dataset_name>.db
                 if args.db_path is None:
@@ -51,8 +100,13 @@ def main(argv: list = None) -> None:
                 else:
                     db_path = args.db_path
 
-                create_sqlite_db_from_dir(args.data_dir, db_path, preprocess=not args.no_preprocess)
+                create_sqlite_db_from_dir(args.data_dir, db_path, preprocess=not args.no_preprocess, engine=args.csv_engine,
+                                          build_sketches=args.build_sketches, build_rollups=args.build_rollups,
+                                          dictionary_encode=args.dictionary_encode, dedupe=args.dedupe,
+                                          dedupe_prefilter=not args.no_dedupe_prefilter)
                 logging.info("Created sqlite DB at %s", db_path)
+                if args.build_feature_tables:
+                    _build_feature_tables([db_path])
                 try:
                     tables = list_db_tables(db_path)
                     logging.info("DB tables: %s", tables)
@@ -62,10 +116,12 @@ def main(argv: list = None) -> None:
             logging.error("Failed to create sqlite DB: %s", e)
         return
 
-    df = load_csv(args.input, nrows=args.nrows, low_memory=False)
+    df = load_csv(args.input, nrows=args.nrows, low_memory=False, engine=args.csv_engine)
     df = clean_column_names(df)
     df = infer_and_parse_dates(df)
     df = downcast_numeric(df)
+    if not args.no_categorize:
+        df = categorize_low_cardinality(df)
 
     # Optional de-identification: hash id columns (patient/provider)
     if args.hash_ids:
@@ -96,14 +152,17 @@ def main(argv: list = None) -> None:
     # Feature engineering only (no ML)
     if args.compute_features:
         try:
-            df_feats = create_fraud_features(df, amount_col=amount_col)
-            save_csv(df_feats, args.features_output)
-            logging.info("Saved feature-engineered dataset to %s", args.features_output)
+            df_feats = create_fraud_features(df, amount_col=amount_col, n_jobs=args.jobs)
+            features_path = save_dataset(df_feats, args.features_output, fmt=args.output_format, partition_by=args.partition_by)
+            logging.info("Saved feature-engineered dataset to %s", features_path)
         except Exception as e:
             logging.error("Failed to compute features: %s", e)
 
     # save cleaned DataFrame
-    save_csv(df, args.output)
+    if args.output_format == "csv" and args.partition_by is None:
+        save_csv(df, args.output)
+    else:
+        save_dataset(df, args.output, fmt=args.output_format, partition_by=args.partition_by)
 
 
 if __name__ == "__main__":
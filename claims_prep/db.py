@@ -1,71 +1,165 @@
 from pathlib import Path
 import logging
-import sqlite3
-from typing import Iterable, List, Optional
+from typing import Iterable, Iterator, List, Optional
 
 import pandas as pd
 
-from .cleaning import clean_column_names, infer_and_parse_dates, downcast_numeric
-from .io import load_csv
-
-
-def _connect(db_path: Path) -> sqlite3.Connection:
-    """Return a sqlite3 connection; parents for file are created by caller if needed."""
-    conn = sqlite3.connect(str(db_path))
-    return conn
-
-
-def create_sqlite_db_from_dir(data_dir: Path, db_path: Path, csv_glob: str = "*.csv", chunk_size: int = 100_000,
-                              preprocess: bool = True, if_exists: str = "replace") -> None:
+from .cleaning import clean_column_names, infer_and_parse_dates, downcast_numeric, detect_claim_id_columns
+from .dedupe import ClaimDeduper
+from .io import load_csv, iter_csv_chunks, find_csv_files, csv_stem
+from .dictionary import DictionaryEncoder, drop_table_or_view, encoded_table_name, is_encoded
+from .rollups import backfill_rollups, reset_rollups, update_rollups
+from .service import build_feature_tables, drop_feature_tables
+from .sketches import ClaimsSummary, load_summaries, save_summaries, sketch_path_for_db
+from .sqlutil import connect_db, object_type, quote_identifier, table_exists
+
+
+def create_sqlite_db_from_dir(data_dir: Path, db_path: Path, csv_glob: Optional[str] = None, chunk_size: int = 100_000,
+                              preprocess: bool = True, if_exists: str = "replace", engine: str = "auto",
+                              build_sketches: bool = False, build_rollups: bool = False,
+                              dictionary_encode: bool = False, dedupe: Optional[str] = None,
+                              dedupe_prefilter: bool = True) -> None:
     """Create or update a sqlite database by ingesting all CSV files in `data_dir`.
 
-    Each CSV becomes a table named after the CSV filename (stem). Files are read in
+    Each CSV becomes a table named after the CSV filename (stem, without any .gz/.zst/.bz2
+    compression suffix; compressed files are decompressed on the fly). Files are read in
     streaming chunks to avoid large memory usage. When `preprocess` is True the
     helpers from `claims_prep.cleaning` are applied to each chunk before writing.
 
     Parameters
     - data_dir: Path containing CSV files
     - db_path: Path to sqlite file to create/modify
-    - csv_glob: glob pattern for CSV files
+    - csv_glob: glob pattern for CSV files; None matches plain and compressed CSVs
     - chunk_size: rows per chunk for streaming read
     - preprocess: whether to run clean_column_names, infer_and_parse_dates, downcast_numeric
-    - if_exists: behavior for existing tables: 'replace' or 'append'
+    - if_exists: behavior for existing tables: 'replace' or 'append'. Several files mapping to the
+      same table (claims.csv, claims.csv.gz) replace it once and then append
+    - engine: CSV parser engine ('auto', 'pyarrow', 'c', 'python'); see `io.resolve_csv_engine`
+    - build_sketches: also build a streaming `ClaimsSummary` (moments, quantile sketch, per-provider
+      moments) for each table with an amount column and persist them next to the DB
+      (see `sketches.sketch_path_for_db`); in 'append' mode existing summaries are extended, and a
+      table without one is first summarized from the rows it already holds
+    - build_rollups: maintain per provider/patient/diagnosis/claim-month count/total/mean rollup
+      tables inside the DB (see `claims_prep.rollups`), upserted chunk by chunk; appending to a table
+      without rollups first builds them from its existing rows
+    - dictionary_encode: store low-cardinality string columns as integer codes with per-column
+      lookup tables behind a decoding view named after the table (see `claims_prep.dictionary`)
+    - dedupe: None, 'first' or 'latest'. Keep one row per claim ID (first detected claim-ID column)
+      across chunks, files mapped to the same table and appends, keeping the first or the latest
+      occurrence (repeats already stored by an earlier run without dedupe are reduced the same way); enforced with a UNIQUE index and INSERT OR IGNORE/REPLACE (see `claims_prep.dedupe`).
+      Rollups retract superseded rows under 'latest'; sketches are not retracted and still
+      include them.
+    - dedupe_prefilter: put a fixed-size Bloom filter in front of the index lookups used to count
+      duplicates, so IDs that are definitely new skip the lookup
+
+    Feature tables built from an ingested table (see `service.build_feature_tables`) are dropped
+    before it is written and rebuilt once ingestion finishes, so lookups never see stale features.
     """
     data_dir = Path(data_dir)
     db_path = Path(db_path)
-    files = sorted(data_dir.glob(csv_glob))
+    files = find_csv_files(data_dir, csv_glob)
     if not files:
-        logging.warning("No CSV files found in %s matching %s", data_dir, csv_glob)
+        logging.warning("No CSV files found in %s matching %s", data_dir, csv_glob or "*.csv[.gz|.zst|.bz2]")
         return
 
     # Ensure parent exists for db
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = _connect(db_path)
+    conn = connect_db(db_path)
+    summaries = load_summaries(sketch_path_for_db(db_path)) if build_sketches else {}
 
+    seen_tables = set()
+    stale_features = set()
     try:
         for f in files:
-            table = f.stem
+            table = csv_stem(f)
             logging.info("Ingesting %s -> table %s (chunksize=%d)", f, table, chunk_size)
             first_chunk = True
-            for chunk in pd.read_csv(f, chunksize=chunk_size):
+            # files mapping to the same table (claims.csv + claims.csv.gz) replace it once, then append
+            replace = if_exists == "replace" and table not in seen_tables
+            seen_tables.add(table)
+            if drop_feature_tables(conn, table):
+                stale_features.add(table)
+            if build_sketches and (replace or table not in summaries):
+                summaries[table] = ClaimsSummary()
+                if not replace and object_type(conn, table) in ("table", "view"):
+                    # a summary started by an append must also cover the rows already in the table
+                    for old in pd.read_sql_query(f"SELECT * FROM {quote_identifier(table)}", conn, chunksize=chunk_size):
+                        summaries[table].update(old)
+            if build_rollups and replace:
+                reset_rollups(conn, table)
+            if replace:
+                drop_table_or_view(conn, table)
+            encoder = None
+            if is_encoded(conn, table):
+                encoder = DictionaryEncoder(conn, table)
+            elif dictionary_encode:
+                if table_exists(conn, table):
+                    logging.warning("Table %s already exists unencoded; appending without dictionary encoding", table)
+                else:
+                    encoder = DictionaryEncoder(conn, table)
+            target = encoded_table_name(table) if encoder else table
+            deduper = None
+            for chunk in iter_csv_chunks(f, chunk_size=chunk_size, engine=engine):
                 if preprocess:
                     chunk = clean_column_names(chunk)
                     chunk = infer_and_parse_dates(chunk)
                     chunk = downcast_numeric(chunk)
                 # pandas.to_sql with a sqlite3.Connection works; use replace on first chunk if requested
-                mode = "replace" if first_chunk and if_exists == "replace" else "append"
-                chunk.to_sql(table, conn, if_exists=mode, index=False)
+                mode = "replace" if first_chunk and replace else "append"
+                if dedupe and first_chunk:
+                    id_cols = detect_claim_id_columns(chunk)
+                    if id_cols:
+                        deduper = ClaimDeduper(conn, target, id_cols[0], policy=dedupe, prefilter=dedupe_prefilter)
+                        if table_exists(conn, target) and deduper.ensure_index() and build_rollups:
+                            # stored repeats were removed; rebuild the rollups from the remaining rows
+                            reset_rollups(conn, table)
+                    else:
+                        logging.info("No claim-ID column in %s; ingesting without dedupe", table)
+                if build_rollups and first_chunk and not replace:
+                    # rollups created by an append must also cover the rows already in the table
+                    backfill_rollups(conn, table, chunk)
+                if deduper:
+                    exists = table_exists(conn, target)
+                    chunk, replaced = deduper.filter(chunk, table_exists=exists)
+                    if replaced and build_rollups and dedupe == "latest":
+                        old = deduper.fetch_rows(table, replaced)
+                        update_rollups(conn, table, infer_and_parse_dates(old) if preprocess else old, sign=-1)
+                    stored = encoder.encode(chunk) if encoder else chunk
+                    if not exists:
+                        stored.head(0).to_sql(target, conn, if_exists=mode, index=False)
+                        deduper.ensure_index()
+                    stored.to_sql(target, conn, if_exists="append", index=False, method=deduper.insert_method)
+                else:
+                    stored = encoder.encode(chunk) if encoder else chunk
+                    stored.to_sql(target, conn, if_exists=mode, index=False)
+                if encoder and first_chunk:
+                    # the decoding view must exist before later chunks look up replaced rows through it
+                    encoder.create_view()
+                if build_sketches:
+                    summaries[table].update(chunk)
+                if build_rollups:
+                    update_rollups(conn, table, chunk)
                 first_chunk = False
+            if encoder:
+                encoder.create_view()
+            if deduper:
+                deduper.log_stats()
             logging.info("Finished ingesting %s -> %s", f, table)
     finally:
         conn.close()
 
+    if build_sketches:
+        save_summaries({t: s for t, s in summaries.items() if s.amount_col}, sketch_path_for_db(db_path))
+    for table in sorted(stale_features):
+        logging.info("Rebuilding feature tables from re-ingested table %s", table)
+        build_feature_tables(db_path, table)
+
 
 def list_db_tables(db_path: Path) -> List[str]:
-    """Return list of table names in the sqlite database."""
-    conn = _connect(db_path)
+    """Return list of table and view names in the sqlite database."""
+    conn = connect_db(db_path)
     try:
-        cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        cur = conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view');")
         tables = [r[0] for r in cur.fetchall()]
         return tables
     finally:
@@ -77,7 +171,7 @@ def read_table(db_path: Path, table: str, sql: Optional[str] = None) -> pd.DataF
 
     If `sql` is provided it is run instead of a simple SELECT * FROM table.
     """
-    conn = _connect(db_path)
+    conn = connect_db(db_path)
     try:
         if sql is None:
             sql = f"SELECT * FROM {table}"
@@ -87,25 +181,43 @@ def read_table(db_path: Path, table: str, sql: Optional[str] = None) -> pd.DataF
     return df
 
 
-def csv_to_table(csv_path: Path, db_path: Path, table: Optional[str] = None, preprocess: bool = True) -> None:
+def iter_table_chunks(db_path: Path, table: str, chunk_size: int = 100_000, sql: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Stream a table (or an arbitrary SQL query) from sqlite in DataFrame chunks of `chunk_size` rows."""
+    conn = connect_db(db_path)
+    try:
+        if sql is None:
+            sql = f"SELECT * FROM {table}"
+        yield from pd.read_sql_query(sql, conn, chunksize=chunk_size)
+    finally:
+        conn.close()
+
+
+def csv_to_table(csv_path: Path, db_path: Path, table: Optional[str] = None, preprocess: bool = True,
+                 engine: str = "auto") -> None:
     """Helper to load a single CSV into sqlite (small files loaded wholly)."""
     csv_path = Path(csv_path)
-    tname = table or csv_path.stem
+    tname = table or csv_stem(csv_path)
     logging.info("Loading CSV %s into table %s", csv_path, tname)
-    df = load_csv(csv_path)
+    df = load_csv(csv_path, engine=engine)
     if preprocess:
         df = clean_column_names(df)
         df = infer_and_parse_dates(df)
         df = downcast_numeric(df)
-    conn = _connect(db_path)
+    conn = connect_db(db_path)
     try:
+        stale_features = drop_feature_tables(conn, tname)
         df.to_sql(tname, conn, if_exists="replace", index=False)
     finally:
         conn.close()
+    if stale_features:
+        build_feature_tables(db_path, tname)
 
 
-def create_sqlite_databases_for_data_root(data_root: Path, databases_dir: Path, csv_glob: str = "*.csv",
-                                         chunk_size: int = 100_000, preprocess: bool = True, if_exists: str = "replace") -> List[Path]:
+def create_sqlite_databases_for_data_root(data_root: Path, databases_dir: Path, csv_glob: Optional[str] = None,
+                                         chunk_size: int = 100_000, preprocess: bool = True, if_exists: str = "replace",
+                                         engine: str = "auto", build_sketches: bool = False,
+                                         build_rollups: bool = False, dictionary_encode: bool = False,
+                                         dedupe: Optional[str] = None, dedupe_prefilter: bool = True) -> List[Path]:
     """Scan a root data directory for dataset subdirectories and create one sqlite DB
     per dataset in `databases_dir`.
 
@@ -122,14 +234,17 @@ def create_sqlite_databases_for_data_root(data_root: Path, databases_dir: Path,
     for child in sorted(data_root.iterdir()):
         if not child.is_dir():
             continue
-        files = list(child.glob(csv_glob))
+        files = find_csv_files(child, csv_glob)
         if not files:
             logging.info("Skipping %s: no CSV files found", child)
             continue
         db_path = databases_dir / f"{child.name}.db"
         logging.info("Creating DB for dataset %s -> %s", child.name, db_path)
         try:
-            create_sqlite_db_from_dir(child, db_path, csv_glob=csv_glob, chunk_size=chunk_size, preprocess=preprocess, if_exists=if_exists)
+            create_sqlite_db_from_dir(child, db_path, csv_glob=csv_glob, chunk_size=chunk_size, preprocess=preprocess, if_exists=if_exists, engine=engine,
+                                      build_sketches=build_sketches, build_rollups=build_rollups,
+                                      dictionary_encode=dictionary_encode, dedupe=dedupe,
+                                      dedupe_prefilter=dedupe_prefilter)
             created.append(db_path)
         except Exception:
             logging.exception("Failed to create DB for dataset %s", child.name)
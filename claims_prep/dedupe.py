@@ -0,0 +1,204 @@
+"""Ingestion-time claim deduplication for sqlite tables.
+
+`ClaimDeduper` keeps one row per claim ID in a table across chunks, files mapped to the same
+table and later `if_exists='append'` runs:
+
+- a UNIQUE index on the claim-ID column (created after reducing any repeats already stored by
+  earlier runs without dedupe to one row per ID) plus `INSERT OR IGNORE` (policy 'first') or
+  `INSERT OR REPLACE` (policy 'latest') makes sqlite enforce uniqueness;
+- an optional fixed-size `BloomFilter` in front of it answers "definitely new" for most IDs, so
+  only possible repeats are looked up in the index to count duplicates. Memory stays bounded
+  by the filter size instead of growing with a Python set of every ID.
+"""
+import logging
+import math
+import sqlite3
+from typing import Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .sqlutil import SQL_BATCH as _SQL_BATCH, object_type, quote_identifier as _quote
+
+
+DEDUPE_POLICIES = ("first", "latest")
+
+def _id_key(value):
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    return value
+
+
+def _hash_ids(ids: pd.Series) -> np.ndarray:
+    """Hash non-null IDs so values sqlite stores as equal hash alike.
+
+    An integer ID column turns float64 in chunks with a missing ID, and sqlite compares 1 and
+    1.0 as equal, so whole-number floats are hashed as the integer they represent.
+    """
+    if pd.api.types.is_float_dtype(ids.dtype):
+        values = ids.to_numpy(dtype="float64")
+        whole = np.isfinite(values) & (values == np.trunc(values)) & (np.abs(values) < 2.0 ** 63)
+        keys = values.astype(object)
+        keys[whole] = values[whole].astype(np.int64)
+        ids = pd.Series(keys)
+    elif ids.dtype == object:
+        ids = ids.map(_id_key)
+    return pd.util.hash_pandas_object(ids.astype(str), index=False).to_numpy(dtype="uint64")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string-ified IDs (vectorised with numpy).
+
+    Sized for `capacity` items at false-positive rate `fpr`; beyond capacity the false-positive
+    rate rises but membership answers stay one-sided (no false negatives).
+    """
+
+    def __init__(self, capacity: int = 10_000_000, fpr: float = 0.01):
+        self.num_bits = max(64, int(math.ceil(-capacity * math.log(fpr) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, ids: pd.Series) -> np.ndarray:
+        h = _hash_ids(ids)
+        h1 = h & np.uint64(0xFFFFFFFF)
+        h2 = (h >> np.uint64(32)) | np.uint64(1)
+        probes = np.arange(self.num_hashes, dtype=np.uint64)[:, None]
+        return (h1[None, :] + probes * h2[None, :]) % np.uint64(self.num_bits)
+
+    def add(self, ids: pd.Series) -> None:
+        pos = self._positions(ids).ravel()
+        np.bitwise_or.at(self.bits, (pos >> np.uint64(3)).astype(np.int64), (1 << (pos & np.uint64(7))).astype(np.uint8))
+
+    def might_contain(self, ids: pd.Series) -> np.ndarray:
+        pos = self._positions(ids)
+        hit = self.bits[(pos >> np.uint64(3)).astype(np.int64)] & (1 << (pos & np.uint64(7))).astype(np.uint8)
+        return (hit != 0).all(axis=0)
+
+
+class ClaimDeduper:
+    """Deduplicate chunks written to `table` on claim-ID column `id_col`.
+
+    Call `filter(chunk)` before writing and pass `insert_method` as `DataFrame.to_sql(method=...)`.
+    Counters in `within_chunk_duplicates` and `existing_duplicates` report what was dropped
+    (policy 'first') or superseded (policy 'latest').
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str, id_col: str, policy: str = "first",
+                 prefilter: bool = True, prefilter_capacity: int = 10_000_000):
+        if policy not in DEDUPE_POLICIES:
+            raise ValueError(f"Unknown dedupe policy {policy!r}; expected one of {DEDUPE_POLICIES}")
+        self.conn = conn
+        self.table = table
+        self.id_col = id_col
+        self.policy = policy
+        self.bloom = BloomFilter(capacity=prefilter_capacity) if prefilter else None
+        self.rows_seen = 0
+        self.within_chunk_duplicates = 0
+        self.existing_duplicates = 0
+        self._indexed = False
+
+    @property
+    def duplicates(self) -> int:
+        return self.within_chunk_duplicates + self.existing_duplicates
+
+    def _remove_stored_duplicates(self) -> int:
+        """Delete stored rows repeating a claim ID, keeping the first or most recently written row per policy."""
+        keep = "MIN" if self.policy == "first" else "MAX"
+        col, table = _quote(self.id_col), _quote(self.table)
+        removed = self.conn.execute(
+            f"DELETE FROM {table} WHERE {col} IS NOT NULL AND rowid NOT IN "
+            f"(SELECT {keep}(rowid) FROM {table} WHERE {col} IS NOT NULL GROUP BY {col})").rowcount
+        if removed:
+            logging.warning("Removed %d rows of %s repeating a claim ID in %s (keep %s) before enforcing uniqueness",
+                            removed, self.table, self.id_col, self.policy)
+        return removed
+
+    def ensure_index(self) -> int:
+        """Create the UNIQUE index (the table must exist) and seed the prefilter from existing rows.
+
+        A table ingested without dedupe may already repeat claim IDs; those rows are reduced to
+        one per ID according to the policy before the index is created. Returns the number of
+        stored rows removed, so callers can rebuild anything derived from them.
+        """
+        if self._indexed:
+            return 0
+        index = f"ux_{self.table}_{self.id_col}"
+        removed = 0
+        if object_type(self.conn, index) != "index":
+            removed = self._remove_stored_duplicates()
+        self.conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(index)} "
+                          f"ON {_quote(self.table)} ({_quote(self.id_col)})")
+        if self.bloom is not None:
+            cur = self.conn.execute(f"SELECT {_quote(self.id_col)} FROM {_quote(self.table)} "
+                                    f"WHERE {_quote(self.id_col)} IS NOT NULL")
+            while True:
+                rows = cur.fetchmany(100_000)
+                if not rows:
+                    break
+                self.bloom.add(pd.Series([r[0] for r in rows]))
+        self._indexed = True
+        return removed
+
+    def _existing_ids(self, ids: Iterable) -> List:
+        found = []
+        ids = list(ids)
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = ids[start:start + _SQL_BATCH]
+            marks = ", ".join("?" * len(batch))
+            found.extend(r[0] for r in self.conn.execute(
+                f"SELECT {_quote(self.id_col)} FROM {_quote(self.table)} WHERE {_quote(self.id_col)} IN ({marks})", batch))
+        return found
+
+    def filter(self, chunk: pd.DataFrame, table_exists: bool = True) -> Tuple[pd.DataFrame, List]:
+        """Return `(rows_to_write, existing_ids)` for `chunk`.
+
+        Repeats within the chunk are reduced to the first/last occurrence. IDs already in the
+        table are dropped (policy 'first') or kept so the insert replaces them (policy 'latest');
+        either way they are returned as `existing_ids`. Rows with a null ID are always kept.
+        """
+        self.rows_seen += len(chunk)
+        ids = chunk[self.id_col]
+        dup = ids.duplicated(keep="first" if self.policy == "first" else "last") & ids.notna()
+        self.within_chunk_duplicates += int(dup.sum())
+        chunk = chunk[~dup]
+        ids = chunk[self.id_col]
+
+        existing: List = []
+        if table_exists:
+            candidates = ids.dropna()
+            if self.bloom is not None and len(candidates):
+                candidates = candidates[self.bloom.might_contain(candidates)]
+            # look up with the values as stored so sqlite type affinity matches
+            existing = self._existing_ids(candidates.tolist()) if len(candidates) else []
+        self.existing_duplicates += len(existing)
+        if self.bloom is not None and ids.notna().any():
+            self.bloom.add(ids.dropna())
+        if existing and self.policy == "first":
+            chunk = chunk[~ids.isin(existing)]
+        return chunk, existing
+
+    def fetch_rows(self, source: str, ids: List) -> pd.DataFrame:
+        """Read the stored rows for `ids` from `source` (the table or its decoding view)."""
+        frames = []
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = ids[start:start + _SQL_BATCH]
+            marks = ", ".join("?" * len(batch))
+            frames.append(pd.read_sql_query(
+                f"SELECT * FROM {_quote(source)} WHERE {_quote(self.id_col)} IN ({marks})", self.conn, params=batch))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    @property
+    def insert_method(self):
+        verb = "IGNORE" if self.policy == "first" else "REPLACE"
+
+        def _insert(pd_table, conn, keys, data_iter):
+            cols = ", ".join(_quote(k) for k in keys)
+            marks = ", ".join("?" * len(keys))
+            conn.executemany(f"INSERT OR {verb} INTO {_quote(pd_table.name)} ({cols}) VALUES ({marks})", list(data_iter))
+
+        return _insert
+
+    def log_stats(self) -> None:
+        logging.info("Dedupe %s on %s (keep %s): %d rows read, %d duplicate claim IDs "
+                     "(%d within chunks, %d already in table)", self.table, self.id_col, self.policy,
+                     self.rows_seen, self.duplicates, self.within_chunk_duplicates, self.existing_duplicates)
@@ -0,0 +1,117 @@
+"""Dictionary-encoded sqlite storage for low-cardinality string columns.
+
+An encoded table `<table>` is stored as:
+
+- `<table>_encoded` — the rows, with each encoded column holding an INTEGER code;
+- `<table>__dict_<column>` — one lookup table per encoded column (`code INTEGER PRIMARY KEY, value TEXT`);
+- `<table>` — a VIEW joining the lookups back in, so `read_table` and ad-hoc SQL see the original values.
+
+Codes are assigned as new values appear, so chunks appended later (or in a later run with
+`if_exists='append'`) reuse the same dictionaries.
+"""
+import logging
+import sqlite3
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .cleaning import detect_claim_id_columns, detect_low_cardinality_columns
+from .sqlutil import object_type, quote_identifier as _quote
+
+
+def encoded_table_name(table: str) -> str:
+    return f"{table}_encoded"
+
+
+def lookup_table_name(table: str, column: str) -> str:
+    return f"{table}__dict_{column}"
+
+
+def is_encoded(conn: sqlite3.Connection, table: str) -> bool:
+    return object_type(conn, encoded_table_name(table)) == "table"
+
+
+def drop_table_or_view(conn: sqlite3.Connection, table: str) -> None:
+    """Drop `table` whether it is a plain table or an encoded view plus its backing tables."""
+    prefix = lookup_table_name(table, "")
+    lookups = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND substr(name, 1, ?) = ?",
+                                          (len(prefix), prefix)).fetchall()]
+    kind = object_type(conn, table)
+    if kind == "view":
+        conn.execute(f"DROP VIEW {_quote(table)}")
+    elif kind == "table":
+        conn.execute(f"DROP TABLE {_quote(table)}")
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(encoded_table_name(table))}")
+    for name in lookups:
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(name)}")
+    conn.commit()
+
+
+class DictionaryEncoder:
+    """Encode chunks of one table into integer codes, maintaining its sqlite lookup tables.
+
+    `columns` defaults to the dictionaries already present in the DB when `<table>_encoded`
+    exists (append; possibly none, in which case nothing more is encoded) or, for a new table,
+    to the low-cardinality string columns of the first chunk passed to `encode`.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str, columns: Optional[List[str]] = None,
+                 max_unique_ratio: float = 0.5):
+        self.conn = conn
+        self.table = table
+        self.max_unique_ratio = max_unique_ratio
+        self.lookups: Dict[str, Dict[object, int]] = {}
+        prefix = lookup_table_name(table, "")
+        existing = [r[0][len(prefix):] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND substr(name, 1, ?) = ?", (len(prefix), prefix)).fetchall()]
+        for col in existing:
+            rows = conn.execute(f"SELECT value, code FROM {_quote(lookup_table_name(table, col))}").fetchall()
+            self.lookups[col] = dict(rows)
+        if columns is None and is_encoded(conn, table):
+            # the stored columns are fixed: re-detecting could start encoding a column that already holds raw text
+            columns = existing
+        self.columns = columns
+
+    def encode(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Return a copy of `chunk` with encoded columns replaced by nullable integer codes."""
+        if self.columns is None:
+            # claim IDs are (near) unique, so encoding them never pays off and would break dedupe lookups
+            self.columns = detect_low_cardinality_columns(chunk, max_unique_ratio=self.max_unique_ratio,
+                                                          exclude=detect_claim_id_columns(chunk))
+            logging.info("Dictionary-encoding columns of %s: %s", self.table, self.columns)
+        out = chunk.copy()
+        for col in self.columns:
+            if col not in out.columns:
+                continue
+            lookup = self.lookups.get(col)
+            if lookup is None:
+                lookup = self.lookups[col] = {}
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(lookup_table_name(self.table, col))} "
+                                  "(code INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+            values = out[col].astype(object).where(out[col].notna(), None)
+            values = values.map(lambda v: None if v is None else str(v))
+            new = [v for v in pd.unique(values.dropna()) if v not in lookup]
+            if new:
+                start = len(lookup)
+                rows = [(start + i, v) for i, v in enumerate(new)]
+                lookup.update((v, code) for code, v in rows)
+                self.conn.executemany(f"INSERT INTO {_quote(lookup_table_name(self.table, col))} (code, value) VALUES (?, ?)", rows)
+            out[col] = values.map(lookup).astype("Int64")
+        return out
+
+    def create_view(self) -> None:
+        """(Re)create the decoding view `<table>` over `<table>_encoded`."""
+        encoded = encoded_table_name(self.table)
+        columns = [r[1] for r in self.conn.execute(f"PRAGMA table_info({_quote(encoded)})").fetchall()]
+        selects, joins = [], []
+        for i, col in enumerate(columns):
+            if col in self.lookups:
+                alias = f"d{i}"
+                selects.append(f"{alias}.value AS {_quote(col)}")
+                joins.append(f"LEFT JOIN {_quote(lookup_table_name(self.table, col))} {alias} ON t.{_quote(col)} = {alias}.code")
+            else:
+                selects.append(f"t.{_quote(col)}")
+        self.conn.execute(f"DROP VIEW IF EXISTS {_quote(self.table)}")
+        self.conn.execute(f"CREATE VIEW {_quote(self.table)} AS SELECT {', '.join(selects)} FROM {_quote(encoded)} t "
+                          + " ".join(joins))
+        self.conn.commit()
@@ -1,21 +1,47 @@
 import logging
-from typing import Optional
+from pathlib import Path
+from typing import Optional, Union
 
 import pandas as pd
 
 from .db import create_sqlite_db_from_dir, list_db_tables, read_table
 from .io import preview_df
+from .rollups import query_summary
+from .sketches import ClaimsSummary, QuantileSketch
+from .sqlutil import connect_db
 
 
-def summarize_claims(df: pd.DataFrame, amount_col: Optional[str] = None, group_by: Optional[str] = None) -> pd.DataFrame:
+def summarize_claims(df: Union[pd.DataFrame, ClaimsSummary, None] = None, amount_col: Optional[str] = None,
+                     group_by: Optional[str] = None, db_path: Optional[Path] = None, table: str = "claims") -> pd.DataFrame:
     """A small summary helper that returns aggregated metrics useful for quick inspection.
 
-    This is intentionally light-weight and safe for interactive use.
+    This is intentionally light-weight and safe for interactive use. `df` may also be a
+    streaming `ClaimsSummary` (e.g. loaded via `sketches.load_summaries`); the result is then
+    answered from its accumulators when `group_by` is None or matches its group column.
+
+    With `db_path` (and no `df`) `table` is summarized inside sqlite: from a rollup table when
+    one matches `group_by` (see `claims_prep.rollups`), else with a SQL GROUP BY.
     """
+    if df is None:
+        if db_path is None:
+            raise ValueError("summarize_claims needs either df or db_path")
+        conn = connect_db(db_path)
+        try:
+            agg = query_summary(conn, table, amount_col=amount_col, group_by=group_by)
+        finally:
+            conn.close()
+        logging.info("Summarized claims from %s:%s; rows: %d", db_path, table, len(agg))
+        return agg
+    if isinstance(df, ClaimsSummary):
+        if group_by and group_by != df.group_col:
+            raise ValueError(f"ClaimsSummary is grouped by {df.group_col!r}, not {group_by!r}")
+        agg = df.to_frame(by_group=bool(group_by))
+        logging.info("Summarized claims from streaming summary; rows: %d", len(agg))
+        return agg
     amount_col = amount_col or next((c for c in df.columns if "amount" in c), None)
     gb = group_by or None
     if gb and gb in df.columns:
-        agg = df.groupby(gb)[amount_col].agg(count="count", total="sum", mean="mean").reset_index()
+        agg = df.groupby(gb, observed=True)[amount_col].agg(count="count", total="sum", mean="mean").reset_index()
     elif amount_col:
         agg = df[amount_col].agg(count="count", total="sum", mean="mean").to_frame().T
     else:
@@ -24,12 +50,16 @@ def summarize_claims(df: pd.DataFrame, amount_col: Optional[str] = None, group_b
     return agg
 
 
-def example_filters(df: pd.DataFrame, amount_col: Optional[str] = None) -> pd.DataFrame:
+def example_filters(df: pd.DataFrame, amount_col: Optional[str] = None,
+                    sketch: Optional[QuantileSketch] = None, q: float = 0.99) -> pd.DataFrame:
     """Return a small example filtered DataFrame for demonstration/testing.
 
-    This function demonstrates how a user might select suspicious rows.
+    This function demonstrates how a user might select suspicious rows. When `sketch` is given
+    the `q` threshold comes from the (dataset-wide) quantile sketch instead of `df`, so the
+    filter can be applied chunk by chunk to a stream that never fits in memory.
     """
     amount_col = amount_col or next((c for c in df.columns if "amount" in c), None)
     if amount_col and amount_col in df.columns:
-        return df[df[amount_col] > df[amount_col].quantile(0.99)]
+        threshold = sketch.quantile(q) if sketch is not None else df[amount_col].quantile(q)
+        return df[df[amount_col] > threshold]
     return df.head(0)
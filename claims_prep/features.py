@@ -1,6 +1,9 @@
 import hashlib
 import logging
-from typing import List, Optional
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -28,15 +31,14 @@ def deidentify_ids(df: pd.DataFrame, id_cols: List[str], salt: str = "") -> pd.D
     return df
 
 
-def create_fraud_features(df: pd.DataFrame, amount_col: Optional[str] = None, date_col: Optional[str] = None) -> pd.DataFrame:
-    """
-    Create lightweight features useful for downstream fraud/anomaly detection training.
+# rows below this are computed serially; process start-up and shard transport dominate otherwise
+_MIN_PARALLEL_ROWS = 50_000
+
+_CODE_COLUMN_HINTS = ("dx", "diagnosis", "cpt", "procedure", "hcpcs")
 
-    This function delegates internal steps to private helpers; it returns an enriched copy
-    of the input DataFrame and does not fit any model.
-    """
-    df = df.copy()
 
+def _add_row_features(df: pd.DataFrame, amount_col: Optional[str], date_col: Optional[str]) -> Tuple[pd.DataFrame, Optional[str]]:
+    """Add the per-row amount and date features; returns the frame and the date column used."""
     # amount-based features
     amount_col = amount_col or detect_amount_column(df)
     if amount_col:
@@ -55,30 +57,93 @@ def create_fraud_features(df: pd.DataFrame, amount_col: Optional[str] = None, da
         df["claim_hour"] = df["_claim_dt"].dt.hour.fillna(-1).astype(int)
     else:
         df["_claim_dt"] = pd.NaT
+    return df, date_col
+
+
+def _add_patient_aggregates(df: pd.DataFrame, patient_col: str, date_col: Optional[str]) -> pd.DataFrame:
+    agg = df.groupby(patient_col, observed=True)["amount"].agg(
+        patient_claim_count="count",
+        patient_total_amount="sum",
+        patient_mean_amount="mean",
+        patient_std_amount="std",
+    )
+    df = df.merge(agg, how="left", left_on=patient_col, right_index=True)
+    if date_col:
+        df = df.sort_values([patient_col, "_claim_dt"])
+        df["prev_dt"] = df.groupby(patient_col, observed=True)["_claim_dt"].shift(1)
+        df["days_since_prev_claim"] = (df["_claim_dt"] - df["prev_dt"]).dt.days.fillna(-1)
+        df = df.sort_index()
+    return df
+
+
+def _code_columns(df: pd.DataFrame) -> List[str]:
+    return [c for c in df.columns if pd.api.types.is_string_dtype(df[c]) and any(substr in c for substr in _CODE_COLUMN_HINTS)]
+
+
+def _patient_unique_codes(df: pd.DataFrame, patient_col: str, code_cols: List[str]) -> pd.Series:
+    return df.groupby(patient_col, observed=True)[code_cols].nunique().sum(axis=1).rename("patient_unique_codes")
+
+
+def _provider_aggregates(count: pd.Series, total: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame({
+        "provider_claim_count": count,
+        "provider_total_amount": total,
+        "provider_mean_amount": total / count,
+    })
+
+
+def _fill_numeric_features(df: pd.DataFrame) -> pd.DataFrame:
+    # fill NaNs and ensure numeric feature columns exist
+    numeric_features = [
+        "amount", "amount_log1p", "amount_z",
+        "patient_claim_count", "patient_total_amount", "patient_mean_amount", "patient_std_amount",
+        "provider_claim_count", "provider_total_amount", "provider_mean_amount",
+        "days_since_prev_claim", "patient_unique_codes"
+    ]
+    for f in numeric_features:
+        if f in df.columns:
+            df[f] = pd.to_numeric(df[f], errors="coerce").fillna(0.0)
+
+    logging.info("Created fraud-focused features; sample columns: %s", [c for c in df.columns if c in numeric_features])
+    return df
+
+
+def create_fraud_features(df: pd.DataFrame, amount_col: Optional[str] = None, date_col: Optional[str] = None,
+                          n_jobs: int = 1) -> pd.DataFrame:
+    """
+    Create lightweight features useful for downstream fraud/anomaly detection training.
+
+    This function delegates internal steps to private helpers; it returns an enriched copy
+    of the input DataFrame and does not fit any model.
+
+    With `n_jobs` > 1 (-1 for all cores) the per-patient features are computed in a process
+    pool over shards hash-partitioned by patient ID, and the per-provider aggregates are merged
+    from per-shard partial counts/sums (see `_create_fraud_features_parallel`). The result
+    matches the serial path column for column; provider totals and means may differ from it in
+    the last floating-point bits because the partial sums are added in a different order.
+    Frames smaller than `_MIN_PARALLEL_ROWS` rows are always computed serially.
+    """
+    df = df.copy()
+    df, date_col = _add_row_features(df, amount_col, date_col)
 
     # detect IDs
     patient_cols, provider_cols = detect_id_columns(df)
     patient_col = patient_cols[0] if patient_cols else None
     provider_col = provider_cols[0] if provider_cols else None
 
+    if n_jobs < 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs > 1 and patient_col and "amount" in df.columns and len(df) >= _MIN_PARALLEL_ROWS:
+        df = _create_fraud_features_parallel(df, patient_col, provider_col, date_col, n_jobs)
+        return _fill_numeric_features(df)
+
     # per-patient aggregations
     if patient_col and "amount" in df.columns:
-        agg = df.groupby(patient_col)["amount"].agg(
-            patient_claim_count="count",
-            patient_total_amount="sum",
-            patient_mean_amount="mean",
-            patient_std_amount="std",
-        )
-        df = df.merge(agg, how="left", left_on=patient_col, right_index=True)
-        if date_col:
-            df = df.sort_values([patient_col, "_claim_dt"])
-            df["prev_dt"] = df.groupby(patient_col)["_claim_dt"].shift(1)
-            df["days_since_prev_claim"] = (df["_claim_dt"] - df["prev_dt"]).dt.days.fillna(-1)
-            df = df.sort_index()
+        df = _add_patient_aggregates(df, patient_col, date_col)
 
     # per-provider aggregations
     if provider_col and "amount" in df.columns:
-        agg_p = df.groupby(provider_col)["amount"].agg(
+        agg_p = df.groupby(provider_col, observed=True)["amount"].agg(
             provider_claim_count="count",
             provider_total_amount="sum",
             provider_mean_amount="mean",
@@ -86,21 +151,114 @@ def create_fraud_features(df: pd.DataFrame, amount_col: Optional[str] = None, da
         df = df.merge(agg_p, how="left", left_on=provider_col, right_index=True)
 
     # count unique diagnosis/procedure codes if such columns exist
-    code_cols = [c for c in df.columns if pd.api.types.is_string_dtype(df[c]) and any(substr in c for substr in ("dx", "diagnosis", "cpt", "procedure", "hcpcs"))]
+    code_cols = _code_columns(df)
     if code_cols and patient_col:
-        uniq_codes = df.groupby(patient_col)[code_cols].nunique().sum(axis=1).rename("patient_unique_codes")
+        uniq_codes = _patient_unique_codes(df, patient_col, code_cols)
         df = df.merge(uniq_codes, how="left", left_on=patient_col, right_index=True)
 
-    # fill NaNs and ensure numeric feature columns exist
-    numeric_features = [
-        "amount", "amount_log1p", "amount_z",
-        "patient_claim_count", "patient_total_amount", "patient_mean_amount", "patient_std_amount",
-        "provider_claim_count", "provider_total_amount", "provider_mean_amount",
-        "days_since_prev_claim", "patient_unique_codes"
-    ]
-    for f in numeric_features:
-        if f in df.columns:
-            df[f] = pd.to_numeric(df[f], errors="coerce").fillna(0.0)
+    return _fill_numeric_features(df)
 
-    logging.info("Created fraud-focused features; sample columns: %s", [c for c in df.columns if c in numeric_features])
-    return df
+
+# --- parallel path -------------------------------------------------------------------------
+#
+# Frames travel between processes as Arrow IPC streams written into `multiprocessing.shared_memory`
+# blocks, so shards are not pickled through the pool's pipes; without pyarrow (or for columns
+# Arrow cannot represent) they fall back to ordinary pickling. Each block is unlinked by its reader.
+
+
+def _to_shared(df: pd.DataFrame):
+    """Return a handle for `df`: ("shm", name, size) when Arrow can carry it, else ("frame", df)."""
+    try:
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        buf = sink.getvalue()
+    except Exception:
+        return ("frame", df)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, buf.size))
+    try:
+        shm.buf[:buf.size] = memoryview(buf).cast("B")
+    except Exception:
+        shm.unlink()
+        raise
+    finally:
+        shm.close()
+    return ("shm", shm.name, buf.size)
+
+
+def _from_shared(handle) -> pd.DataFrame:
+    if handle[0] == "frame":
+        return handle[1]
+    import pyarrow as pa
+    _, name, size = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # copy out of the block so it can be unlinked before the frame is used
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+    return pa.ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+
+
+def _patient_shard_features(handle, patient_col: str, provider_col: Optional[str], date_col: Optional[str],
+                            code_cols: List[str]):
+    """Worker: per-patient columns of one shard plus its per-provider (count, sum) partials."""
+    shard = _from_shared(handle)
+    before = set(shard.columns)
+    shard = _add_patient_aggregates(shard, patient_col, date_col)
+    patient = shard[[c for c in shard.columns if c not in before]].copy()
+    if code_cols:
+        uniq = _patient_unique_codes(shard, patient_col, code_cols)
+        patient["patient_unique_codes"] = shard[[patient_col]].merge(uniq, how="left", left_on=patient_col,
+                                                                     right_index=True)["patient_unique_codes"]
+    partials = None
+    if provider_col:
+        partials = shard.groupby(provider_col, observed=True)["amount"].agg(["count", "sum"])
+    return _to_shared(patient), (_to_shared(partials) if partials is not None else None)
+
+
+def _create_fraud_features_parallel(df: pd.DataFrame, patient_col: str, provider_col: Optional[str],
+                                    date_col: Optional[str], n_jobs: int) -> pd.DataFrame:
+    """Per-patient/per-provider features of `create_fraud_features` computed over `n_jobs` processes.
+
+    Rows are hash-partitioned on `patient_col`, so every patient lands wholly in one shard and
+    per-patient aggregates, previous-claim gaps and unique-code counts are exact per shard.
+    Provider aggregates span shards: each shard returns per-provider counts and sums, which are
+    added up here. Columns are reassembled in the serial path's order (and row order).
+    """
+    code_cols = _code_columns(df)
+    # shards carry a positional index; results are realigned to the original labels at the end
+    work = df.reset_index(drop=True)
+    keys = pd.util.hash_pandas_object(work[patient_col], index=False).to_numpy() % np.uint64(n_jobs)
+    needed = list(dict.fromkeys([patient_col, "amount", "_claim_dt"] + ([provider_col] if provider_col else []) + code_cols))
+    shards = [work.loc[keys == i, needed] for i in range(n_jobs)]
+    shards = [s for s in shards if len(s)]
+    logging.info("Computing patient features over %d shards (%d processes)", len(shards), n_jobs)
+
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(shards))) as pool:
+        futures = [pool.submit(_patient_shard_features, _to_shared(s), patient_col, provider_col, date_col, code_cols)
+                   for s in shards]
+        results = [f.result() for f in futures]
+
+    patient = pd.concat([_from_shared(p) for p, _ in results]).sort_index()
+    uniq_codes = patient.pop("patient_unique_codes") if "patient_unique_codes" in patient.columns else None
+    work = pd.concat([work, patient], axis=1)
+    if date_col:
+        # serial path ends its per-patient step with sort_index() on the original labels
+        order = pd.Series(np.arange(len(df)), index=df.index).sort_index().to_numpy()
+        work = work.take(order)
+
+    if provider_col:
+        partials = pd.concat([_from_shared(p) for _, p in results if p is not None])
+        partials = partials.groupby(level=0, observed=True).sum()
+        agg_p = _provider_aggregates(partials["count"], partials["sum"])
+        work = work.merge(agg_p, how="left", left_on=provider_col, right_index=True)
+
+    if uniq_codes is not None:
+        work["patient_unique_codes"] = uniq_codes
+
+    work.index = df.index[work.index.to_numpy()]
+    return work
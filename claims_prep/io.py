@@ -1,13 +1,89 @@
 from pathlib import Path
+import io
 import logging
+from typing import Iterator, List, Optional
+
 import pandas as pd
 
 
-def load_csv(path: Path, nrows: int = None, low_memory: bool = False, **read_kwargs) -> pd.DataFrame:
-    """Load a CSV into a pandas DataFrame with logging and safe error handling."""
-    logging.info("Loading CSV: %s", path)
+# Plain and compressed CSV suffixes recognised in dataset directories and for --input.
+# pandas and pyarrow both infer the codec from the extension, so no temp files are needed.
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.zst", ".csv.bz2")
+
+CSV_ENGINES = ("auto", "pyarrow", "c", "python")
+
+# bytes of decompressed CSV handed to each multi-threaded pyarrow parse when streaming chunks
+_ARROW_BLOCK_BYTES = 64 << 20
+
+
+def _pyarrow_available() -> bool:
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_csv_engine(engine: str = "auto") -> str:
+    """Return a concrete pandas parser engine for `engine`.
+
+    'auto' picks the multi-threaded pyarrow reader when pyarrow is installed and
+    falls back to pandas' C parser otherwise. Requesting 'pyarrow' explicitly
+    without pyarrow installed logs a warning and also falls back to 'c'.
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine {engine!r}; expected one of {CSV_ENGINES}")
+    if engine in ("auto", "pyarrow"):
+        if _pyarrow_available():
+            return "pyarrow"
+        if engine == "pyarrow":
+            logging.warning("pyarrow is not installed; falling back to the pandas C parser")
+        return "c"
+    return engine
+
+
+def is_csv_path(path: Path) -> bool:
+    """Return True if `path` has a plain or compressed CSV suffix."""
+    return str(path).lower().endswith(CSV_SUFFIXES)
+
+
+def csv_stem(path: Path) -> str:
+    """Return the file name with any CSV/compression suffix removed (claims.csv.gz -> claims)."""
+    name = Path(path).name
+    lower = name.lower()
+    for suffix in sorted(CSV_SUFFIXES, key=len, reverse=True):
+        if lower.endswith(suffix):
+            return name[: -len(suffix)]
+    return Path(path).stem
+
+
+def find_csv_files(data_dir: Path, csv_glob: Optional[str] = None) -> List[Path]:
+    """List CSV files in `data_dir`, sorted by name.
+
+    When `csv_glob` is None all plain and compressed CSVs (see CSV_SUFFIXES) are
+    returned; otherwise the glob is applied as-is.
+    """
+    data_dir = Path(data_dir)
+    if csv_glob is not None:
+        return sorted(data_dir.glob(csv_glob))
+    return sorted(p for p in data_dir.iterdir() if p.is_file() and is_csv_path(p))
+
+
+def load_csv(path: Path, nrows: int = None, low_memory: bool = False, engine: str = "auto", **read_kwargs) -> pd.DataFrame:
+    """Load a CSV (optionally .gz/.zst/.bz2 compressed) into a pandas DataFrame with logging and safe error handling.
+
+    `engine` selects the parser (see `resolve_csv_engine`). The pyarrow engine does not
+    support `nrows`, so a bounded read uses the C parser instead.
+    """
+    engine = resolve_csv_engine(engine)
+    if engine == "pyarrow" and nrows is not None:
+        engine = "c"
+    logging.info("Loading CSV: %s (engine=%s)", path, engine)
     try:
-        df = pd.read_csv(path, nrows=nrows, low_memory=low_memory, **read_kwargs)
+        if engine == "pyarrow":
+            df = pd.read_csv(path, engine="pyarrow", **read_kwargs)
+        else:
+            df = pd.read_csv(path, nrows=nrows, low_memory=low_memory, engine=engine, **read_kwargs)
     except Exception as e:
         logging.error("Failed to read CSV: %s", e)
         raise
@@ -15,6 +91,126 @@ def load_csv(path: Path, nrows: int = None, low_memory: bool = False, **read_kwa
     return df
 
 
+class _ChainedStream(io.RawIOBase):
+    """Read-only file object over `head` followed by the unread rest of `stream`."""
+
+    def __init__(self, head: bytes, stream):
+        self._head = head
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._head:
+            data, self._head = self._head[:len(b)], self._head[len(b):]
+        else:
+            data = self._stream.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def _parse_arrow_block(block: bytes, names: Optional[List[str]], types: Optional[dict]):
+    """Parse one newline-terminated block with pyarrow's multi-threaded `read_csv`.
+
+    `names`/`types` come from the file's first block; a block whose values do not fit those
+    types (e.g. an int column that turns float) is re-parsed with its own type inference,
+    as pandas' chunked reader would.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    # strings_can_be_null: read empty fields as NaN like pandas does, not as ""
+    read_options = pacsv.ReadOptions(use_threads=True, column_names=names)
+    try:
+        return pacsv.read_csv(pa.py_buffer(block), read_options=read_options,
+                              convert_options=pacsv.ConvertOptions(column_types=types or {}, strings_can_be_null=True))
+    except pa.ArrowInvalid:
+        if not types:
+            raise
+        return pacsv.read_csv(pa.py_buffer(block), read_options=read_options,
+                              convert_options=pacsv.ConvertOptions(strings_can_be_null=True))
+
+
+def _iter_arrow_chunks(path: Path, chunk_size: int, block_bytes: int = _ARROW_BLOCK_BYTES) -> Iterator[pd.DataFrame]:
+    """Stream a CSV in `chunk_size` row DataFrames, parsing ~`block_bytes` blocks with pyarrow's threaded reader.
+
+    The decompressed input is cut at line ends (so, as with pyarrow's default parse options,
+    quoted values must not contain newlines). If pyarrow cannot parse a block, or a block is
+    cut inside a quoted value, the rest of the file is read with the pandas C parser instead.
+    """
+    import pyarrow as pa
+
+    stream = pa.input_stream(str(path), compression="detect")
+    header = b""
+    names = types = None
+    pending = None
+    carry = b""
+    try:
+        while True:
+            data = stream.read(block_bytes)
+            block = carry + data
+            if data:
+                cut = block.rfind(b"\n") + 1
+                if cut == 0:
+                    carry = block
+                    continue
+                block, carry = block[:cut], block[cut:]
+            if not block:
+                break
+            try:
+                if block.count(b'"') % 2:
+                    # pyarrow would close the open quote at the block end and return a truncated row
+                    raise pa.ArrowInvalid("a quoted value spans a line break")
+                table = _parse_arrow_block(block, names, types)
+            except pa.ArrowInvalid as e:
+                logging.warning("pyarrow could not parse %s (%s); reading the rest with the pandas C parser", path, e)
+                if pending is not None and pending.num_rows:
+                    yield pending.to_pandas()
+                rest = io.BufferedReader(_ChainedStream(header + block + carry, stream))
+                yield from pd.read_csv(rest, chunksize=chunk_size, engine="c")
+                return
+            if names is None:
+                names = table.column_names
+                header = block[:block.find(b"\n") + 1]
+                types = {}
+            # a column empty so far is typed by the first block that has values for it
+            types.update((f.name, f.type) for f in table.schema if f.name not in types and not pa.types.is_null(f.type))
+            if pending is not None:
+                if all(old.type == new.type or pa.types.is_null(old.type)
+                       for old, new in zip(pending.schema, table.schema)):
+                    pending = pending.cast(table.schema)
+                if pending.schema.equals(table.schema):
+                    table = pa.concat_tables([pending, table])
+                elif pending.num_rows:
+                    yield pending.to_pandas()
+            start = 0
+            while table.num_rows - start >= chunk_size:
+                yield table.slice(start, chunk_size).to_pandas()
+                start += chunk_size
+            pending = table.slice(start)
+            if not data:
+                break
+        if pending is not None and pending.num_rows:
+            yield pending.to_pandas()
+    finally:
+        stream.close()
+
+
+def iter_csv_chunks(path: Path, chunk_size: int = 100_000, engine: str = "auto") -> Iterator[pd.DataFrame]:
+    """Yield DataFrame chunks from a (possibly compressed) CSV.
+
+    With the pyarrow engine the file is parsed in large blocks with pyarrow's multi-threaded
+    reader (see `_iter_arrow_chunks`); a chunk may come out smaller than `chunk_size` where a
+    block's column types differ from the previous block's.
+    """
+    engine = resolve_csv_engine(engine)
+    if engine == "pyarrow":
+        yield from _iter_arrow_chunks(path, chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, engine=engine)
+
+
 def save_csv(df: pd.DataFrame, out_path: Path):
     """Save a DataFrame to CSV, creating parent dirs as needed."""
     out_path.parent.mkdir(parents=True, exist_ok=True)
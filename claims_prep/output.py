@@ -0,0 +1,221 @@
+"""Dataset writers for cleaned and feature-engineered claims.
+
+`DatasetWriter` writes CSV, Parquet or Feather (Arrow IPC) output incrementally: each
+`write()` call appends one row group (Parquet) / record batch (Feather) / CSV block, so it
+can sit at the end of a chunked pipeline. With `partition_by` the output is a Hive-style
+directory tree (`<out>/claim_month=2021-01/part-00000.parquet`) so downstream jobs can read
+only the partitions and columns they need. A partitioned write replaces any previous
+partitioned output at the same path.
+
+Parquet and Feather require `pyarrow`; CSV output has no extra dependencies.
+"""
+from collections import OrderedDict
+from pathlib import Path
+import logging
+import re
+import shutil
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+
+from .cleaning import detect_id_columns
+
+
+OUTPUT_FORMATS = ("csv", "parquet", "feather")
+PARTITION_KEYS = ("claim_month", "provider")
+
+# value used for rows whose partition key is missing (same token Hive/Spark use)
+_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+_PART_FILE = re.compile(r"part-\d{5}\.(csv|parquet|feather)")
+
+
+def output_path_for_format(path: Path, fmt: str) -> Path:
+    """Swap a `.csv` suffix for the suffix matching `fmt` (processed_claims.csv -> processed_claims.parquet)."""
+    path = Path(path)
+    if fmt != "csv" and path.suffix.lower() == ".csv":
+        return path.with_suffix(f".{fmt}")
+    return path
+
+
+def _partition_values(df: pd.DataFrame, partition_by: str) -> Tuple[str, pd.Series]:
+    """Return `(column_name, values)` giving the partition value (as str) for each row of `df`.
+
+    'claim_month' is derived (YYYY-MM) from the first datetime column, 'provider' maps to the
+    first detected provider id column and any other value is used as a column name.
+    """
+    if partition_by == "claim_month":
+        date_cols = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+        if not date_cols:
+            raise ValueError("Cannot partition by claim_month: no datetime column found")
+        values = df[date_cols[0]].dt.strftime("%Y-%m")
+        return "claim_month", values.astype(object).where(values.notna(), _NULL_PARTITION)
+
+    col = partition_by
+    if partition_by == "provider":
+        _, provider_cols = detect_id_columns(df)
+        if not provider_cols:
+            raise ValueError("Cannot partition by provider: no provider id column detected")
+        col = provider_cols[0]
+    if col not in df.columns:
+        raise ValueError(f"Partition column {col!r} not found")
+    values = df[col].map(lambda v: _NULL_PARTITION if pd.isna(v) else str(v))
+    return col, values.astype(object)
+
+
+def _clear_partitioned_output(path: Path) -> None:
+    """Remove a previous partitioned output at `path`, refusing to touch anything else."""
+    if not path.exists():
+        return
+    if not path.is_dir():
+        raise ValueError(f"Cannot write partitioned output to {path}: it exists and is not a directory")
+    entries = list(path.iterdir())
+    for entry in entries:
+        if not (entry.is_dir() and "=" in entry.name
+                and all(f.is_file() and _PART_FILE.fullmatch(f.name) for f in entry.iterdir())):
+            raise ValueError(f"Refusing to overwrite {path}: it holds {entry.name!r}, which is not a partition "
+                             "written by DatasetWriter; choose an empty or new output directory")
+    for entry in entries:
+        shutil.rmtree(entry)
+    if entries:
+        logging.info("Removed %d partitions of a previous output in %s", len(entries), path)
+
+
+class DatasetWriter:
+    """Incrementally write DataFrame chunks as CSV, Parquet or Feather, optionally partitioned.
+
+    Usage:
+
+        with DatasetWriter(Path("out.parquet"), fmt="parquet", partition_by="claim_month") as w:
+            for chunk in chunks:
+                w.write(chunk)
+
+    The Arrow schema is fixed by the first chunk (integers widened to int64 so per-chunk
+    downcasting does not produce incompatible row groups); later chunks are cast to it.
+
+    At most `max_open_files` Parquet/Feather partition files are kept open; when more partitions
+    are active the least recently written one is finalized, and rows arriving for it later go
+    to a new `part-NNNNN` file in the same partition directory.
+    """
+
+    def __init__(self, out_path: Path, fmt: str = "csv", partition_by: Optional[str] = None,
+                 max_open_files: int = 128):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {fmt!r}; expected one of {OUTPUT_FORMATS}")
+        self.out_path = Path(out_path)
+        self.fmt = fmt
+        self.partition_by = partition_by
+        self.rows_written = 0
+        self.max_open_files = max(1, max_open_files)
+        self._schema = None
+        # open Arrow writers and current CSV file, keyed by partition directory (or the output file)
+        self._writers: "OrderedDict[Path, object]" = OrderedDict()
+        self._csv_files: Dict[Path, Path] = {}
+        self._parts_started: Dict[Path, int] = {}
+        if partition_by:
+            _clear_partitioned_output(self.out_path)
+            self.out_path.mkdir(parents=True, exist_ok=True)
+        else:
+            self.out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _target_for(self, column: Optional[str] = None, key: Optional[str] = None) -> Path:
+        """Return the output file (unpartitioned) or the partition directory for `key`."""
+        if column is None:
+            return self.out_path
+        part_dir = self.out_path / f"{column}={quote(key, safe='')}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        return part_dir
+
+    def _new_file(self, target: Path) -> Path:
+        if not self.partition_by:
+            return target
+        n = self._parts_started.get(target, 0)
+        self._parts_started[target] = n + 1
+        return target / f"part-{n:05d}.{self.fmt}"
+
+    def _arrow_table(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._schema is None:
+            fields = []
+            for field in table.schema:
+                if pa.types.is_integer(field.type):
+                    field = field.with_type(pa.int64())
+                elif pa.types.is_null(field.type):
+                    field = field.with_type(pa.string())
+                fields.append(field)
+            self._schema = pa.schema(fields)
+        return table.select(self._schema.names).cast(self._schema)
+
+    def _write_part(self, target: Path, df: pd.DataFrame) -> None:
+        if self.fmt == "csv":
+            # CSV blocks are appended with a fresh open per write, so no file handles stay open
+            path = self._csv_files.get(target)
+            if path is None:
+                path = self._csv_files[target] = self._new_file(target)
+                df.to_csv(path, index=False, mode="w", header=True)
+            else:
+                df.to_csv(path, index=False, mode="a", header=False)
+            return
+
+        table = self._arrow_table(df)
+        writer = self._writers.get(target)
+        if writer is None:
+            path = self._new_file(target)
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                writer = pq.ParquetWriter(str(path), self._schema)
+            else:
+                import pyarrow.ipc as ipc
+                writer = ipc.new_file(str(path), self._schema, options=ipc.IpcWriteOptions(compression="lz4"))
+            self._writers[target] = writer
+            if len(self._writers) > self.max_open_files:
+                _, oldest = self._writers.popitem(last=False)
+                oldest.close()
+        else:
+            self._writers.move_to_end(target)
+        writer.write_table(table)
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Append `df` to the output (one row group / record batch per partition touched)."""
+        if df.empty:
+            return
+        if not self.partition_by:
+            self._write_part(self._target_for(), df)
+        else:
+            column, keys = _partition_values(df, self.partition_by)
+            # Hive convention: the partition column lives in the directory name, not the file
+            body = df.drop(columns=[column]) if column in df.columns else df
+            for key, idx in keys.groupby(keys, sort=True).groups.items():
+                self._write_part(self._target_for(column, key), body.loc[idx])
+        self.rows_written += len(df)
+
+    def close(self) -> None:
+        """Finalize all open Parquet/Feather files."""
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        logging.info("Wrote %d rows as %s to %s", self.rows_written, self.fmt, self.out_path)
+
+
+def save_dataset(df: pd.DataFrame, out_path: Path, fmt: str = "csv", partition_by: Optional[str] = None,
+                 row_group_size: int = 100_000, max_open_files: int = 128) -> Path:
+    """Write `df` to `out_path` in `fmt`, `row_group_size` rows per write. Returns the path written.
+
+    A `.csv` suffix on `out_path` is swapped for the format's suffix; with `partition_by`
+    the returned path is the root directory of the partition tree, and a previous partitioned
+    output there is replaced (see `DatasetWriter`).
+    """
+    out_path = output_path_for_format(out_path, fmt)
+    with DatasetWriter(out_path, fmt=fmt, partition_by=partition_by, max_open_files=max_open_files) as writer:
+        for start in range(0, len(df), row_group_size):
+            writer.write(df.iloc[start:start + row_group_size])
+    return out_path
@@ -0,0 +1,200 @@
+"""Materialized rollup tables maintained inside the per-dataset sqlite DB.
+
+For each ingested table with an amount column, one rollup table per detected dimension
+(provider, patient, diagnosis code, claim month) holds `count`, `total` and `mean` of the
+amount per key. Rollups are upserted chunk by chunk during ingestion, so appends update them
+incrementally instead of regrouping the raw rows. A `rollup_catalog` table records which rollups
+exist so `summarize_claims(db_path=...)` can answer matching queries with a small lookup.
+"""
+import logging
+import re
+import sqlite3
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from .cleaning import detect_amount_column, detect_id_columns
+from .sqlutil import object_type, quote_identifier as _quote, table_exists
+
+
+ROLLUP_CATALOG = "rollup_catalog"
+ROLLUP_DIMENSIONS = ("provider", "patient", "diagnosis", "claim_month")
+
+
+def rollup_table_name(table: str, dimension: str) -> str:
+    return f"rollup_{table}_{dimension}"
+
+
+def detect_rollup_columns(df: pd.DataFrame) -> Dict[str, str]:
+    """Map each rollup dimension to the source column it is keyed on (missing dimensions are omitted).
+
+    `claim_month` uses the first datetime column, so it requires dates to be parsed (preprocess).
+    """
+    patient_cols, provider_cols = detect_id_columns(df)
+    dx_cols = [c for c in df.columns if re.search(r"diagnosis|dx", c)]
+    date_cols = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    found = {
+        "provider": provider_cols[0] if provider_cols else None,
+        "patient": patient_cols[0] if patient_cols else None,
+        "diagnosis": dx_cols[0] if dx_cols else None,
+        "claim_month": date_cols[0] if date_cols else None,
+    }
+    return {dim: col for dim, col in found.items() if col is not None}
+
+
+def _ensure_catalog(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {ROLLUP_CATALOG} ("
+        "source_table TEXT NOT NULL, dimension TEXT NOT NULL, source_col TEXT NOT NULL, "
+        "group_col TEXT NOT NULL, amount_col TEXT NOT NULL, rollup_table TEXT NOT NULL, "
+        "PRIMARY KEY (source_table, dimension))"
+    )
+
+
+def _register_rollup(conn: sqlite3.Connection, table: str, dimension: str, source_col: str, group_col: str,
+                     amount_col: str) -> str:
+    rollup = rollup_table_name(table, dimension)
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {_quote(rollup)} ("
+        f"{_quote(group_col)} PRIMARY KEY, count INTEGER NOT NULL, total REAL NOT NULL, mean REAL)"
+    )
+    conn.execute(
+        f"INSERT OR REPLACE INTO {ROLLUP_CATALOG} VALUES (?, ?, ?, ?, ?, ?)",
+        (table, dimension, source_col, group_col, amount_col, rollup),
+    )
+    return rollup
+
+
+def reset_rollups(conn: sqlite3.Connection, table: str) -> None:
+    """Drop all rollups of `table` (used when the source table is replaced)."""
+    _ensure_catalog(conn)
+    rows = conn.execute(f"SELECT rollup_table FROM {ROLLUP_CATALOG} WHERE source_table = ?", (table,)).fetchall()
+    for (rollup,) in rows:
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(rollup)}")
+    conn.execute(f"DELETE FROM {ROLLUP_CATALOG} WHERE source_table = ?", (table,))
+    conn.commit()
+
+
+def update_rollups(conn: sqlite3.Connection, table: str, chunk: pd.DataFrame, amount_col: Optional[str] = None,
+                   sign: int = 1) -> None:
+    """Fold one ingested chunk of `table` into its rollup tables, creating them on first use.
+
+    Rows with a missing key are skipped and `count` counts non-null amounts, matching
+    `DataFrame.groupby(...).agg(count=..., total=..., mean=...)`. With `sign=-1` the rows are
+    retracted instead (used when deduplication replaces previously ingested claims); keys left
+    with no rows are removed.
+    """
+    amount_col = amount_col or detect_amount_column(chunk)
+    if chunk.empty or amount_col is None or amount_col not in chunk.columns:
+        return
+    _ensure_catalog(conn)
+    amount = pd.to_numeric(chunk[amount_col], errors="coerce")
+    for dimension, source_col in detect_rollup_columns(chunk).items():
+        if source_col == amount_col:
+            continue
+        if dimension == "claim_month":
+            group_col = "claim_month"
+            keys = chunk[source_col].dt.strftime("%Y-%m")
+        else:
+            group_col = source_col
+            keys = chunk[source_col]
+        rollup = _register_rollup(conn, table, dimension, source_col, group_col, amount_col)
+        agg = amount.groupby(keys).agg(["count", "sum"])
+        rows = list(zip(agg.index.tolist(), (agg["count"] * sign).tolist(), (agg["sum"] * sign).tolist()))
+        conn.executemany(
+            f"INSERT INTO {_quote(rollup)} ({_quote(group_col)}, count, total, mean) "
+            "VALUES (?, ?, ?, CASE WHEN ?2 > 0 THEN ?3 * 1.0 / ?2 END) "
+            f"ON CONFLICT({_quote(group_col)}) DO UPDATE SET "
+            "count = count + excluded.count, total = total + excluded.total, "
+            "mean = CASE WHEN count + excluded.count > 0 "
+            "THEN (total + excluded.total) * 1.0 / (count + excluded.count) END",
+            rows,
+        )
+        if sign < 0:
+            conn.execute(f"DELETE FROM {_quote(rollup)} WHERE count <= 0")
+    conn.commit()
+
+
+def backfill_rollups(conn: sqlite3.Connection, table: str, chunk: pd.DataFrame, amount_col: Optional[str] = None) -> None:
+    """Build the rollups of `table` that do not exist yet from the rows it already holds.
+
+    Used before appending to an existing table, so rollups created by the append cover the
+    earlier rows too. `chunk` (the first chunk to be appended) decides the dimensions, as in
+    `update_rollups`; the aggregation runs in sqlite with one `GROUP BY` per missing rollup.
+    """
+    if object_type(conn, table) not in ("table", "view"):
+        return
+    amount_col = amount_col or detect_amount_column(chunk)
+    columns = {r[1] for r in conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()}
+    if amount_col is None or amount_col not in columns:
+        return
+    _ensure_catalog(conn)
+    existing = {r[0] for r in conn.execute(f"SELECT dimension FROM {ROLLUP_CATALOG} WHERE source_table = ?", (table,))}
+    a = _quote(amount_col)
+    for dimension, source_col in detect_rollup_columns(chunk).items():
+        if source_col == amount_col or dimension in existing or source_col not in columns:
+            continue
+        if dimension == "claim_month":
+            group_col = "claim_month"
+            key = f"strftime('%Y-%m', {_quote(source_col)})"
+        else:
+            group_col = source_col
+            key = _quote(source_col)
+        rollup = _register_rollup(conn, table, dimension, source_col, group_col, amount_col)
+        conn.execute(
+            f"INSERT INTO {_quote(rollup)} ({_quote(group_col)}, count, total, mean) "
+            f"SELECT {key}, COUNT({a}), TOTAL({a}), AVG({a}) FROM {_quote(table)} WHERE {key} IS NOT NULL GROUP BY {key}"
+        )
+        logging.info("Backfilled rollup %s from existing rows of %s", rollup, table)
+    conn.commit()
+
+
+def find_rollup(conn: sqlite3.Connection, table: str, group_by: str,
+                amount_col: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """Return `(rollup_table, group_col)` for a rollup of `table` grouped by `group_by`, or None.
+
+    `group_by` may be the dimension name ('provider') or the rollup's key column ('provider_id').
+    """
+    if not table_exists(conn, ROLLUP_CATALOG):
+        return None
+    sql = (f"SELECT rollup_table, group_col FROM {ROLLUP_CATALOG} "
+           "WHERE source_table = ? AND (dimension = ? OR group_col = ? OR source_col = ?)")
+    params = [table, group_by, group_by, group_by]
+    if amount_col is not None:
+        sql += " AND amount_col = ?"
+        params.append(amount_col)
+    row = conn.execute(sql, params).fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def read_rollup(conn: sqlite3.Connection, rollup_table: str, group_col: str) -> pd.DataFrame:
+    """Read a rollup as a `summarize_claims`-shaped frame: `group_col, count, total, mean`."""
+    df = pd.read_sql_query(
+        f"SELECT {_quote(group_col)}, count, total, mean FROM {_quote(rollup_table)} ORDER BY {_quote(group_col)}",
+        conn,
+    )
+    logging.info("Read %d rows from rollup %s", len(df), rollup_table)
+    return df
+
+
+def query_summary(conn: sqlite3.Connection, table: str, amount_col: Optional[str] = None,
+                  group_by: Optional[str] = None) -> pd.DataFrame:
+    """Summarize `table` inside sqlite: from a matching rollup when one exists, else via SQL aggregation.
+
+    Either way only the aggregated rows are loaded into pandas.
+    """
+    if group_by:
+        found = find_rollup(conn, table, group_by, amount_col)
+        if found:
+            return read_rollup(conn, *found)
+    columns = [r[1] for r in conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()]
+    amount_col = amount_col or next((c for c in columns if "amount" in c), None)
+    if amount_col is None:
+        return pd.DataFrame()
+    aggs = f"COUNT({_quote(amount_col)}) AS count, SUM({_quote(amount_col)}) AS total, AVG({_quote(amount_col)}) AS mean"
+    if group_by and group_by in columns:
+        g = _quote(group_by)
+        sql = f"SELECT {g}, {aggs} FROM {_quote(table)} WHERE {g} IS NOT NULL GROUP BY {g} ORDER BY {g}"
+    else:
+        sql = f"SELECT {aggs} FROM {_quote(table)}"
+    return pd.read_sql_query(sql, conn)
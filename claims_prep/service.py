@@ -0,0 +1,454 @@
+"""Near-real-time patient/provider feature lookups over the per-dataset sqlite DBs.
+
+`build_feature_tables` materializes the per-patient and per-provider aggregates that
+`create_fraud_features` computes (`patient_claim_count`, `provider_mean_amount`, ...) into
+`features_patient` / `features_provider` tables with a unique index on the ID column.
+`create_sqlite_db_from_dir` rebuilds them when it replaces or appends to their source table.
+
+`FeatureService` answers lookups by ID from those tables with a pool of read-only connections
+per dataset and an LRU cache with TTL. The cache is invalidated when a DB file changes on disk
+(e.g. after re-ingestion). `serve` exposes it over a small asyncio HTTP/1.1 server with no
+extra dependencies:
+
+    GET  /features/<dataset>/<patient|provider>/<id>
+    POST /features/<dataset>/<patient|provider>/batch     body: {"ids": ["p1", "p2", ...]}
+    GET  /metrics                                           request counts, QPS, latency quantiles, cache stats
+    GET  /healthz
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import pandas as pd
+
+from .cleaning import detect_amount_column, detect_id_columns
+from .sketches import QuantileSketch
+from .sqlutil import SQL_BATCH as _SQL_BATCH, connect_db, object_type, quote_identifier as _quote, table_exists
+
+
+FEATURE_CATALOG = "feature_catalog"
+FEATURE_KINDS = ("patient", "provider")
+
+def build_feature_tables(db_path: Path, table: str = "claims") -> Dict[str, str]:
+    """(Re)build `features_patient` and `features_provider` from `table` inside sqlite.
+
+    Column names and semantics follow `create_fraud_features` (missing amounts count as 0 and a
+    single-claim std is 0). Returns `{kind: id_column}` for the tables that could be built; a DB
+    without `table` (e.g. a dataset holding only provider reference data) is skipped with a warning.
+    """
+    conn = connect_db(db_path)
+    conn.create_function("sqrt", 1, lambda v: None if v is None else math.sqrt(max(v, 0.0)))
+    try:
+        if object_type(conn, table) not in ("table", "view"):
+            logging.warning("No table %s in %s; no feature tables built", table, db_path)
+            return {}
+        sample = pd.read_sql_query(f"SELECT * FROM {_quote(table)} LIMIT 1000", conn)
+        amount_col = detect_amount_column(sample)
+        patient_cols, provider_cols = detect_id_columns(sample)
+        if amount_col is None:
+            logging.warning("No amount column in %s; no feature tables built", table)
+            return {}
+        a = f"COALESCE({_quote(amount_col)}, 0)"
+        code_cols = [c for c in sample.columns if pd.api.types.is_string_dtype(sample[c])
+                     and any(s in c for s in ("dx", "diagnosis", "cpt", "procedure", "hcpcs"))]
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {FEATURE_CATALOG} "
+                     "(kind TEXT PRIMARY KEY, feature_table TEXT NOT NULL, id_col TEXT NOT NULL, source_table TEXT NOT NULL)")
+        built = {}
+        for kind, cols in (("patient", patient_cols), ("provider", provider_cols)):
+            ftable = f"features_{kind}"
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(ftable)}")
+            conn.execute(f"DELETE FROM {FEATURE_CATALOG} WHERE kind = ?", (kind,))
+            if not cols:
+                continue
+            id_col = _quote(cols[0])
+            selects = [
+                f"COUNT(*) AS {kind}_claim_count",
+                f"SUM({a}) AS {kind}_total_amount",
+                f"AVG({a}) AS {kind}_mean_amount",
+            ]
+            if kind == "patient":
+                selects.append(f"COALESCE(CASE WHEN COUNT(*) > 1 THEN sqrt((SUM({a} * {a}) - SUM({a}) * SUM({a}) / COUNT(*)) "
+                               f"/ (COUNT(*) - 1)) END, 0) AS patient_std_amount")
+                if code_cols:
+                    selects.append(" + ".join(f"COUNT(DISTINCT {_quote(c)})" for c in code_cols) + " AS patient_unique_codes")
+            conn.execute(f"CREATE TABLE {_quote(ftable)} AS SELECT {id_col}, {', '.join(selects)} "
+                         f"FROM {_quote(table)} WHERE {id_col} IS NOT NULL GROUP BY {id_col}")
+            conn.execute(f"CREATE UNIQUE INDEX {_quote(f'ux_{ftable}_{cols[0]}')} ON {_quote(ftable)} ({id_col})")
+            conn.execute(f"INSERT INTO {FEATURE_CATALOG} VALUES (?, ?, ?, ?)", (kind, ftable, cols[0], table))
+            built[kind] = cols[0]
+        conn.commit()
+        logging.info("Built feature tables in %s: %s", db_path, built)
+        return built
+    finally:
+        conn.close()
+
+
+def drop_feature_tables(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Drop the feature tables built from `table` (used when the source table changes); returns their kinds."""
+    if not table_exists(conn, FEATURE_CATALOG):
+        return []
+    rows = conn.execute(f"SELECT kind, feature_table FROM {FEATURE_CATALOG} WHERE source_table = ?", (table,)).fetchall()
+    for _, ftable in rows:
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(ftable)}")
+    conn.execute(f"DELETE FROM {FEATURE_CATALOG} WHERE source_table = ?", (table,))
+    conn.commit()
+    return [kind for kind, _ in rows]
+
+
+def discover_databases(databases_dir: Path) -> Dict[str, Path]:
+    """Map dataset name -> DB path for every `*.db` in `databases_dir` (as written by --all-datasets)."""
+    return {p.stem: p for p in sorted(Path(databases_dir).glob("*.db"))}
+
+
+class LRUCache:
+    """Size-bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[tuple, Tuple[float, object]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key, value) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ConnectionPool:
+    """Fixed-size pool of read-only sqlite connections for one DB, safe to use from executor threads."""
+
+    def __init__(self, db_path: Path, size: int = 4):
+        self.db_path = Path(db_path)
+        self.size = size
+        self.generation = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._queue.put_nowait((self.generation, self._open()))
+
+    def _open(self) -> sqlite3.Connection:
+        uri = self.db_path.resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def recycle(self) -> None:
+        """Mark current connections stale; they are reopened as they are returned to the pool."""
+        self.generation += 1
+
+    async def acquire(self) -> Tuple[int, sqlite3.Connection]:
+        return await self._queue.get()
+
+    def release(self, item: Tuple[int, sqlite3.Connection]) -> None:
+        generation, conn = item
+        if generation != self.generation:
+            conn.close()
+            conn = self._open()
+        self._queue.put_nowait((self.generation, conn))
+
+    def close(self) -> None:
+        while not self._queue.empty():
+            self._queue.get_nowait()[1].close()
+
+
+class ServiceMetrics:
+    """Request counters, a latency quantile sketch (ms) and a 60-second QPS window."""
+
+    def __init__(self, window: int = 60):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.ids_served = 0
+        self.latency_ms = QuantileSketch(k=400)
+        self.window = window
+        self._buckets: deque = deque()  # (second, count)
+
+    def record(self, latency_ms: float, n_ids: int = 0, error: bool = False) -> None:
+        self.requests += 1
+        self.errors += int(error)
+        self.ids_served += n_ids
+        self.latency_ms.update([latency_ms])
+        now = int(time.time())
+        if self._buckets and self._buckets[-1][0] == now:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([now, 1])
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+    def snapshot(self) -> dict:
+        uptime = max(time.time() - self.started, 1e-9)
+        recent = sum(c for _, c in self._buckets)
+        p50, p95, p99 = (self.latency_ms.quantile([0.5, 0.95, 0.99]).tolist() if self.latency_ms.count
+                         else (None, None, None))
+        return {"uptime_s": round(uptime, 3), "requests": self.requests, "errors": self.errors,
+                "ids_served": self.ids_served, "qps_total": self.requests / uptime,
+                f"qps_last_{self.window}s": recent / min(uptime, self.window),
+                "latency_ms": {"p50": p50, "p95": p95, "p99": p99, "max": self.latency_ms.max if self.latency_ms.count else None}}
+
+
+class FeatureService:
+    """Feature lookups by ID over several dataset DBs with pooling, caching and invalidation."""
+
+    def __init__(self, databases: Dict[str, Path], pool_size: int = 4, cache_size: int = 100_000,
+                 cache_ttl: float = 300.0, check_interval: float = 1.0):
+        self.databases = {name: Path(p) for name, p in databases.items()}
+        self.pool_size = pool_size
+        self.cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+        self.check_interval = check_interval
+        self.metrics = ServiceMetrics()
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._catalogs: Dict[str, Dict[str, Tuple[str, str]]] = {}
+        self._generations: Dict[str, int] = {}
+        self._stamps: Dict[str, tuple] = {}
+        self._checked: Dict[str, float] = {}
+
+    def _stamp(self, dataset: str) -> tuple:
+        path = self.databases[dataset]
+        stamp = []
+        for p in (path, path.with_name(path.name + "-wal")):
+            try:
+                st = os.stat(p)
+                stamp.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _refresh(self, dataset: str) -> None:
+        """Invalidate the dataset's cache entries and connections if its DB changed on disk."""
+        now = time.monotonic()
+        if now - self._checked.get(dataset, 0.0) < self.check_interval:
+            return
+        self._checked[dataset] = now
+        stamp = self._stamp(dataset)
+        if dataset in self._stamps and stamp != self._stamps[dataset]:
+            logging.info("DB for dataset %s changed; invalidating cached features", dataset)
+            # bumping the generation orphans old cache keys; the LRU ages them out
+            self._generations[dataset] = self._generations.get(dataset, 0) + 1
+            self._catalogs.pop(dataset, None)
+            if dataset in self._pools:
+                self._pools[dataset].recycle()
+        self._stamps[dataset] = stamp
+
+    def _pool(self, dataset: str) -> ConnectionPool:
+        if dataset not in self._pools:
+            self._pools[dataset] = ConnectionPool(self.databases[dataset], size=self.pool_size)
+        return self._pools[dataset]
+
+    async def _run(self, dataset: str, fn, *args):
+        pool = self._pool(dataset)
+        item = await pool.acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, item[1], *args)
+        finally:
+            pool.release(item)
+
+    @staticmethod
+    def _read_catalog(conn: sqlite3.Connection) -> Dict[str, Tuple[str, str]]:
+        if not table_exists(conn, FEATURE_CATALOG):
+            return {}
+        return {r["kind"]: (r["feature_table"], r["id_col"]) for r in conn.execute(f"SELECT * FROM {FEATURE_CATALOG}")}
+
+    @staticmethod
+    def _query(conn: sqlite3.Connection, feature_table: str, id_col: str, ids: List[str]) -> Dict[str, dict]:
+        """Return `{requested id: features}` for the `ids` found in `feature_table`.
+
+        Rows are keyed by the ID as requested, not as stored: a numeric ID column may hold REAL
+        values (101.0) that sqlite matches to the requested "101" by column affinity.
+        """
+        found = {}
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = ids[start:start + _SQL_BATCH]
+            values = ", ".join(["(?)"] * len(batch))
+            sql = (f"WITH requested(id) AS (VALUES {values}) "
+                   f"SELECT requested.id AS __requested_id, f.* FROM requested "
+                   f"JOIN {_quote(feature_table)} AS f ON f.{_quote(id_col)} = requested.id")
+            for row in conn.execute(sql, batch):
+                features = dict(row)
+                found[features.pop("__requested_id")] = features
+        return found
+
+    async def lookup(self, dataset: str, kind: str, ids: List[str]) -> Dict[str, Optional[dict]]:
+        """Return `{id: features or None}` for `ids` of `kind` ('patient' or 'provider') in `dataset`."""
+        if dataset not in self.databases:
+            raise KeyError(f"Unknown dataset {dataset!r}")
+        if kind not in FEATURE_KINDS:
+            raise KeyError(f"Unknown feature kind {kind!r}; expected one of {FEATURE_KINDS}")
+        self._refresh(dataset)
+        if dataset not in self._catalogs:
+            self._catalogs[dataset] = await self._run(dataset, self._read_catalog)
+        entry = self._catalogs[dataset].get(kind)
+        if entry is None:
+            raise KeyError(f"No {kind} feature table in dataset {dataset!r}; run build_feature_tables first")
+
+        generation = self._generations.get(dataset, 0)
+        results: Dict[str, Optional[dict]] = {}
+        missing = []
+        miss = object()
+        for i in dict.fromkeys(str(i) for i in ids):
+            value = self.cache.get((dataset, generation, kind, i), miss)
+            if value is miss:
+                missing.append(i)
+            else:
+                results[i] = value
+        if missing:
+            found = await self._run(dataset, self._query, entry[0], entry[1], missing)
+            for i in missing:
+                results[i] = found.get(i)
+                # unknown IDs are cached too so repeated misses do not hit sqlite
+                self.cache.put((dataset, generation, kind, i), results[i])
+        return results
+
+    def metrics_snapshot(self) -> dict:
+        snap = self.metrics.snapshot()
+        lookups = self.cache.hits + self.cache.misses
+        snap["cache"] = {"size": len(self.cache), "hits": self.cache.hits, "misses": self.cache.misses,
+                         "hit_rate": self.cache.hits / lookups if lookups else None}
+        snap["datasets"] = sorted(self.databases)
+        return snap
+
+    def close(self) -> None:
+        for pool in self._pools.values():
+            pool.close()
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+# default cap on request bodies (batch lookups); a body is buffered whole before it is parsed
+MAX_BODY_BYTES = 1 << 20
+
+
+def _content_length(headers: Dict[str, str]) -> int:
+    """Return the declared body size; raises ValueError for a malformed or negative Content-Length."""
+    value = headers.get("content-length", "") or "0"
+    if not value.isdigit():
+        raise ValueError(f"invalid Content-Length {value!r}")
+    return int(value)
+
+
+async def _handle_request(service: FeatureService, method: str, path: str, body: bytes) -> Tuple[int, dict, int]:
+    """Route one request; returns `(status, payload, n_ids)`."""
+    parts = [unquote(p) for p in path.split("?", 1)[0].strip("/").split("/")]
+    if parts == ["healthz"]:
+        return 200, {"status": "ok"}, 0
+    if parts == ["metrics"]:
+        return 200, service.metrics_snapshot(), 0
+    if len(parts) != 4 or parts[0] != "features":
+        return 404, {"error": "not found"}, 0
+    _, dataset, kind, ident = parts
+    if ident == "batch":
+        if method != "POST":
+            return 405, {"error": "use POST for batch lookups"}, 0
+        try:
+            ids = json.loads(body or b"{}")["ids"]
+            if not isinstance(ids, list):
+                raise ValueError("ids must be a list")
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": f"invalid batch body: {e}"}, 0
+        try:
+            results = await service.lookup(dataset, kind, ids)
+        except KeyError as e:
+            return 404, {"error": str(e.args[0])}, 0
+        return 200, {"dataset": dataset, "kind": kind, "results": results}, len(ids)
+    if method != "GET":
+        return 405, {"error": "use GET for single lookups"}, 0
+    try:
+        results = await service.lookup(dataset, kind, [ident])
+    except KeyError as e:
+        return 404, {"error": str(e.args[0])}, 0
+    features = results[ident]
+    if features is None:
+        return 404, {"error": f"{kind} {ident!r} not found", "dataset": dataset}, 1
+    return 200, {"dataset": dataset, "kind": kind, "id": ident, "features": features}, 1
+
+
+async def _serve_connection(service: FeatureService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            max_body_bytes: int = MAX_BODY_BYTES) -> None:
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            started = time.perf_counter()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            # a rejected body is left unread, so those responses close the connection (version HTTP/1.0)
+            try:
+                length = _content_length(headers)
+            except ValueError as e:
+                status, payload, n_ids, version = 400, {"error": str(e)}, 0, "HTTP/1.0"
+            else:
+                if length > max_body_bytes:
+                    status, payload, n_ids, version = 413, {"error": f"request body over {max_body_bytes} bytes"}, 0, "HTTP/1.0"
+                else:
+                    body = await reader.readexactly(length)
+                    try:
+                        method, path, version = request_line.decode("latin-1").split()
+                        status, payload, n_ids = await _handle_request(service, method.upper(), path, body)
+                    except ValueError:
+                        status, payload, n_ids, version = 400, {"error": "malformed request line"}, 0, "HTTP/1.0"
+                    except Exception:
+                        logging.exception("Feature lookup failed")
+                        status, payload, n_ids = 500, {"error": "internal error"}, 0
+            data = json.dumps(payload, default=str).encode("utf-8")
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                         .encode("latin-1") + data)
+            await writer.drain()
+            service.metrics.record((time.perf_counter() - started) * 1000.0, n_ids=n_ids, error=status >= 500)
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(databases: Dict[str, Path], host: str = "127.0.0.1", port: int = 8080, pool_size: int = 4,
+                cache_size: int = 100_000, cache_ttl: float = 300.0, max_body_bytes: int = MAX_BODY_BYTES) -> None:
+    """Run the feature lookup HTTP service until cancelled.
+
+    Requests with a malformed Content-Length get 400 and bodies over `max_body_bytes` get 413.
+    """
+    service = FeatureService(databases, pool_size=pool_size, cache_size=cache_size, cache_ttl=cache_ttl)
+    server = await asyncio.start_server(lambda r, w: _serve_connection(service, r, w, max_body_bytes), host, port)
+    logging.info("Serving features for %s on http://%s:%d", sorted(databases), host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
@@ -0,0 +1,328 @@
+"""Mergeable streaming summaries for claim amounts.
+
+These let percentile thresholds and per-group summaries be computed chunk by chunk (or per
+partition / per process) and merged afterwards, so nothing needs the full dataset in RAM:
+
+- `MomentsAccumulator` — exact count/sum/mean/variance/min/max (Chan et al. parallel update).
+- `GroupedMoments` — the same moments keyed by a group column (e.g. provider).
+- `QuantileSketch` — a KLL-style quantile sketch with rank error of about 1% at the default k.
+- `ClaimsSummary` — bundles the three for one table's amount column.
+
+All classes expose `update()`, `merge()` and `to_dict()`/`from_dict()`; `save_summaries` and
+`load_summaries` persist a `{table: ClaimsSummary}` mapping as JSON next to a sqlite DB.
+"""
+from pathlib import Path
+import json
+import logging
+from typing import Dict, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import detect_amount_column, detect_id_columns
+
+
+def _as_float_array(values) -> np.ndarray:
+    arr = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return arr[~np.isnan(arr)]
+
+
+def _json_key(key):
+    """Convert numpy scalars to plain Python so group keys survive json.dump."""
+    return key.item() if hasattr(key, "item") else key
+
+
+class MomentsAccumulator:
+    """Count, sum, mean, variance, min and max over a stream of numbers."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _combine(self, count: int, total: float, mean: float, m2: float, vmin: float, vmax: float) -> None:
+        if count == 0:
+            return
+        n = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / n
+        self.m2 += m2 + delta * delta * self.count * count / n
+        self.count = n
+        self.total += total
+        self.min = min(self.min, vmin)
+        self.max = max(self.max, vmax)
+
+    def update(self, values) -> "MomentsAccumulator":
+        arr = _as_float_array(values)
+        if arr.size:
+            mean = arr.mean()
+            self._combine(arr.size, arr.sum(), mean, ((arr - mean) ** 2).sum(), arr.min(), arr.max())
+        return self
+
+    def merge(self, other: "MomentsAccumulator") -> "MomentsAccumulator":
+        self._combine(other.count, other.total, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def variance(self, ddof: int = 1) -> float:
+        return self.m2 / (self.count - ddof) if self.count > ddof else float("nan")
+
+    def std(self, ddof: int = 1) -> float:
+        return float(np.sqrt(self.variance(ddof)))
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "total": self.total, "mean": self.mean, "m2": self.m2,
+                "min": None if self.count == 0 else self.min, "max": None if self.count == 0 else self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MomentsAccumulator":
+        acc = cls()
+        acc.count, acc.total, acc.mean, acc.m2 = int(data["count"]), data["total"], data["mean"], data["m2"]
+        acc.min = np.inf if data["min"] is None else data["min"]
+        acc.max = -np.inf if data["max"] is None else data["max"]
+        return acc
+
+
+class GroupedMoments:
+    """Per-group `MomentsAccumulator` state held as one DataFrame and merged vectorised."""
+
+    _COLUMNS = ["count", "total", "mean", "m2", "min", "max"]
+
+    def __init__(self):
+        self.state = pd.DataFrame(columns=self._COLUMNS, dtype="float64")
+
+    @classmethod
+    def _merge_states(cls, a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+        if a.empty:
+            return b.copy()
+        a, b = a.align(b, join="outer")
+        na, nb = a["count"].fillna(0), b["count"].fillna(0)
+        ma, mb = a["mean"].fillna(0), b["mean"].fillna(0)
+        n = na + nb
+        delta = mb - ma
+        out = pd.DataFrame(index=a.index)
+        out["count"] = n
+        out["total"] = a["total"].fillna(0) + b["total"].fillna(0)
+        out["mean"] = ma + delta * nb / n
+        out["m2"] = a["m2"].fillna(0) + b["m2"].fillna(0) + delta * delta * na * nb / n
+        out["min"] = np.fmin(a["min"], b["min"])
+        out["max"] = np.fmax(a["max"], b["max"])
+        return out
+
+    def update(self, keys: pd.Series, values: pd.Series) -> "GroupedMoments":
+        vals = pd.to_numeric(pd.Series(values).reset_index(drop=True), errors="coerce")
+        frame = pd.DataFrame({"key": pd.Series(keys).reset_index(drop=True), "value": vals}).dropna()
+        if frame.empty:
+            return self
+        g = frame.groupby("key")["value"]
+        chunk = g.agg(count="count", total="sum", mean="mean", min="min", max="max")
+        chunk["m2"] = g.var(ddof=0) * chunk["count"]
+        self.state = self._merge_states(self.state, chunk[self._COLUMNS].astype("float64"))
+        return self
+
+    def merge(self, other: "GroupedMoments") -> "GroupedMoments":
+        self.state = self._merge_states(self.state, other.state)
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return `key, count, total, mean, std` rows like `summarize_claims` plus std."""
+        out = self.state.copy()
+        out["count"] = out["count"].astype("int64")
+        out["std"] = np.sqrt(out["m2"] / (out["count"] - 1)).where(out["count"] > 1)
+        return out[["count", "total", "mean", "std"]]
+
+    def to_dict(self) -> dict:
+        return {"rows": [[_json_key(k)] + [float(v) for v in row] for k, row in
+                         zip(self.state.index, self.state[self._COLUMNS].itertuples(index=False))]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GroupedMoments":
+        gm = cls()
+        rows = data.get("rows", [])
+        if rows:
+            gm.state = pd.DataFrame([r[1:] for r in rows], index=[r[0] for r in rows], columns=cls._COLUMNS)
+        return gm
+
+
+class QuantileSketch:
+    """KLL-style mergeable quantile sketch.
+
+    Values are buffered in levels; when a level exceeds its capacity it is sorted and every
+    other item (random offset) is promoted to the next level with doubled weight. Memory is
+    O(k log(n/k)) and the rank error is roughly 2/k.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            buf = self.levels[h]
+            if buf.size > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                buf = np.sort(buf)
+                # an odd item stays behind so weights are preserved exactly
+                keep, buf = (buf[:1], buf[1:]) if buf.size % 2 else (buf[:0], buf)
+                promoted = buf[self._rng.integers(2)::2]
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def update(self, values) -> "QuantileSketch":
+        arr = _as_float_array(values)
+        if arr.size:
+            self.count += int(arr.size)
+            self.min = min(self.min, float(arr.min()))
+            self.max = max(self.max, float(arr.max()))
+            self.levels[0] = np.concatenate([self.levels[0], arr])
+            self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, buf in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], buf])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q: Union[float, Sequence[float]]):
+        """Approximate quantile(s) `q` in [0, 1]; returns NaN when the sketch is empty."""
+        qs = np.atleast_1d(np.asarray(q, dtype="float64"))
+        if self.count == 0:
+            out = np.full(qs.shape, np.nan)
+        else:
+            items = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(buf.size, 2.0 ** h) for h, buf in enumerate(self.levels)])
+            order = np.argsort(items, kind="stable")
+            items, cum = items[order], np.cumsum(weights[order])
+            idx = np.searchsorted(cum, qs * cum[-1], side="left").clip(0, items.size - 1)
+            out = items[idx]
+            out = np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, out))
+        return float(out[0]) if np.ndim(q) == 0 else out
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "count": self.count,
+                "min": None if self.count == 0 else self.min, "max": None if self.count == 0 else self.max,
+                "levels": [buf.tolist() for buf in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sk = cls(k=int(data["k"]))
+        sk.count = int(data["count"])
+        sk.min = np.inf if data["min"] is None else data["min"]
+        sk.max = -np.inf if data["max"] is None else data["max"]
+        sk.levels = [np.asarray(buf, dtype="float64") for buf in data["levels"]] or [np.empty(0)]
+        return sk
+
+
+class ClaimsSummary:
+    """Streaming summary of one table's amount column: moments, quantile sketch and per-group moments.
+
+    `amount_col` and `group_col` default to the columns detected on the first non-empty chunk
+    (`detect_amount_column` and the first provider id column).
+    """
+
+    def __init__(self, amount_col: Optional[str] = None, group_col: Optional[str] = None, k: int = 200):
+        self.amount_col = amount_col
+        self.group_col = group_col
+        self.moments = MomentsAccumulator()
+        self.sketch = QuantileSketch(k=k)
+        self.groups = GroupedMoments()
+
+    def update(self, chunk: pd.DataFrame) -> "ClaimsSummary":
+        if chunk.empty:
+            return self
+        if self.amount_col is None:
+            self.amount_col = detect_amount_column(chunk)
+            if self.group_col is None:
+                _, provider_cols = detect_id_columns(chunk)
+                self.group_col = provider_cols[0] if provider_cols else None
+        if self.amount_col is None or self.amount_col not in chunk.columns:
+            return self
+        values = chunk[self.amount_col]
+        self.moments.update(values)
+        self.sketch.update(values)
+        if self.group_col and self.group_col in chunk.columns:
+            self.groups.update(chunk[self.group_col], values)
+        return self
+
+    def merge(self, other: "ClaimsSummary") -> "ClaimsSummary":
+        self.amount_col = self.amount_col or other.amount_col
+        self.group_col = self.group_col or other.group_col
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        self.groups.merge(other.groups)
+        return self
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def to_frame(self, by_group: bool = False) -> pd.DataFrame:
+        """Return a `summarize_claims`-shaped frame (count/total/mean), overall or per `group_col`."""
+        if by_group and self.group_col:
+            out = self.groups.to_frame()[["count", "total", "mean"]]
+            return out.rename_axis(self.group_col).reset_index()
+        return pd.DataFrame([{"count": self.moments.count, "total": self.moments.total, "mean": self.moments.mean}])
+
+    def to_dict(self) -> dict:
+        return {"amount_col": self.amount_col, "group_col": self.group_col, "moments": self.moments.to_dict(),
+                "sketch": self.sketch.to_dict(), "groups": self.groups.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ClaimsSummary":
+        cs = cls(amount_col=data.get("amount_col"), group_col=data.get("group_col"))
+        cs.moments = MomentsAccumulator.from_dict(data["moments"])
+        cs.sketch = QuantileSketch.from_dict(data["sketch"])
+        cs.groups = GroupedMoments.from_dict(data["groups"])
+        return cs
+
+
+def summarize_chunks(chunks: Iterable[pd.DataFrame], amount_col: Optional[str] = None,
+                     group_col: Optional[str] = None, k: int = 200) -> ClaimsSummary:
+    """Build a `ClaimsSummary` from an iterable of DataFrame chunks."""
+    summary = ClaimsSummary(amount_col=amount_col, group_col=group_col, k=k)
+    for chunk in chunks:
+        summary.update(chunk)
+    return summary
+
+
+def sketch_path_for_db(db_path: Path) -> Path:
+    """Return the JSON path used to persist summaries next to `db_path` (claims.db -> claims.sketches.json)."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.sketches.json")
+
+
+def save_summaries(summaries: Dict[str, ClaimsSummary], path: Path) -> None:
+    """Persist a `{table: ClaimsSummary}` mapping as JSON."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({t: s.to_dict() for t, s in summaries.items()}, fh)
+    logging.info("Saved streaming summaries for %d tables to %s", len(summaries), path)
+
+
+def load_summaries(path: Path) -> Dict[str, ClaimsSummary]:
+    """Load summaries written by `save_summaries`; returns {} when the file does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    return {t: ClaimsSummary.from_dict(d) for t, d in data.items()}
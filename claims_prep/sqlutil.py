@@ -0,0 +1,28 @@
+"""Small sqlite helpers shared by the ingestion, rollup, dedupe and feature-service modules."""
+from pathlib import Path
+import sqlite3
+from typing import Optional
+
+
+# sqlite's historical limit on bound parameters per statement
+SQL_BATCH = 900
+
+
+def connect_db(db_path: Path) -> sqlite3.Connection:
+    """Return a sqlite3 connection; parents for file are created by caller if needed."""
+    return sqlite3.connect(str(db_path))
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table/column name for interpolation into SQL."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def object_type(conn: sqlite3.Connection, name: str) -> Optional[str]:
+    """Return 'table', 'view', 'index', ... for `name`, or None when it does not exist."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return object_type(conn, name) == "table"
@@ -0,0 +1,51 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from claims_prep import create_sqlite_db_from_dir
+
+
+def _claims_frame(n: int = 400, seed: int = 0, duplicate_ids: bool = False) -> pd.DataFrame:
+    """Synthetic claims with every column the feature, rollup and dedupe code detects.
+
+    With `duplicate_ids` claim IDs are integers drawn from `n // 2` values, so about half repeat.
+    """
+    rng = np.random.default_rng(seed)
+    claim_ids = rng.integers(0, n // 2, n) if duplicate_ids else [f"c{seed}_{i}" for i in range(n)]
+    return pd.DataFrame({
+        "claim_id": claim_ids,
+        "patient_id": rng.choice([f"p{i}" for i in range(20)], n),
+        "provider_id": rng.choice(["prov1", "prov2", "prov3"], n),
+        "claim_date": pd.to_datetime("2021-01-01") + pd.to_timedelta(rng.integers(0, 180 * 24, n), unit="h"),
+        "diagnosis_code": rng.choice(["I10", "E11", "J45"], n),
+        "cpt_code": rng.choice(["99213", "99214"], n),
+        "amount": rng.integers(1, 500, n).astype(float),
+    })
+
+
+@pytest.fixture
+def make_claims():
+    """Factory for synthetic claim frames: `make_claims(n=400, seed=0, duplicate_ids=False)`."""
+    return _claims_frame
+
+
+@pytest.fixture
+def ingest(tmp_path):
+    """Write a frame as `claims.csv` in a fresh directory and ingest it into `tmp_path / "claims.db"`.
+
+    `ingest(df, chunk_size=50, **kwargs)` passes `kwargs` to `create_sqlite_db_from_dir` and
+    returns the DB path; call it again with `if_exists="append"` to append.
+    """
+    counter = itertools.count()
+
+    def _ingest(df: pd.DataFrame, chunk_size: int = 50, **kwargs):
+        data_dir = tmp_path / f"in{next(counter)}"
+        data_dir.mkdir()
+        df.to_csv(data_dir / "claims.csv", index=False)
+        db_path = tmp_path / "claims.db"
+        create_sqlite_db_from_dir(data_dir, db_path, chunk_size=chunk_size, **kwargs)
+        return db_path
+
+    return _ingest
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+from claims_prep import read_table, summarize_claims
+from claims_prep.dedupe import BloomFilter
+
+
+def _expected(df, policy):
+    keep = "first" if policy == "first" else "last"
+    return df[df["claim_id"].isna() | ~df["claim_id"].duplicated(keep=keep)]
+
+
+def _assert_rollup_matches_table(db_path):
+    table = read_table(db_path, "claims")
+    rollup = summarize_claims(db_path=db_path, group_by="provider").set_index("provider_id")
+    grouped = table.groupby("provider_id")["amount"].agg(["count", "sum"])
+    assert rollup["count"].to_dict() == grouped["count"].to_dict()
+    assert rollup["total"].to_dict() == pytest.approx(grouped["sum"].to_dict())
+
+
+@pytest.mark.parametrize("policy", ["first", "latest"])
+@pytest.mark.parametrize("prefilter", [True, False])
+def test_dedupe_matches_drop_duplicates_across_chunks_and_appends(make_claims, ingest, policy, prefilter):
+    df = make_claims(duplicate_ids=True)
+    for i, part in enumerate([df.iloc[:250], df.iloc[250:]]):
+        db_path = ingest(part, if_exists="replace" if i == 0 else "append", dedupe=policy,
+                         dedupe_prefilter=prefilter, build_rollups=True)
+
+    table = read_table(db_path, "claims")
+    expected = _expected(df, policy)
+    assert table["claim_id"].is_unique
+    got = table.sort_values("claim_id").reset_index(drop=True)
+    want = expected.sort_values("claim_id").reset_index(drop=True)
+    assert got["amount"].tolist() == want["amount"].tolist()
+    assert got["provider_id"].tolist() == want["provider_id"].tolist()
+    _assert_rollup_matches_table(db_path)
+
+
+@pytest.mark.parametrize("policy", ["first", "latest"])
+@pytest.mark.parametrize("dictionary_encode", [False, True])
+def test_dedupe_append_reduces_duplicates_already_stored(make_claims, ingest, policy, dictionary_encode):
+    df = make_claims(duplicate_ids=True)
+    ingest(df.iloc[:250], build_rollups=True, dictionary_encode=dictionary_encode)
+    db_path = ingest(df.iloc[250:], build_rollups=True, dedupe=policy, if_exists="append")
+
+    table = read_table(db_path, "claims")
+    assert table["claim_id"].is_unique
+    got = table.sort_values("claim_id").reset_index(drop=True)
+    want = _expected(df, policy).sort_values("claim_id").reset_index(drop=True)
+    assert got["amount"].tolist() == want["amount"].tolist()
+    _assert_rollup_matches_table(db_path)
+
+
+@pytest.mark.parametrize("policy", ["first", "latest"])
+@pytest.mark.parametrize("prefilter", [True, False])
+@pytest.mark.parametrize("preprocess", [True, False])
+def test_dedupe_treats_int_and_float_ids_alike(ingest, policy, prefilter, preprocess):
+    # unpreprocessed, the second C-parser chunk has a missing ID, so its claim_id column is
+    # read as float64 (1 -> 1.0) while the first chunk's is int64
+    df = pd.DataFrame({
+        "claim_id": pd.array([1, 2, 1, None], dtype="Int64"),
+        "provider_id": ["prov1", "prov1", "prov1", "prov2"],
+        "amount": [10.0, 15.0, 20.0, 100.0],
+    })
+    db_path = ingest(df, chunk_size=2, engine="c", dedupe=policy, dedupe_prefilter=prefilter,
+                     build_rollups=True, preprocess=preprocess)
+
+    table = read_table(db_path, "claims")
+    assert len(table) == 3
+    assert table["amount"].sum() == (125.0 if policy == "first" else 135.0)
+    _assert_rollup_matches_table(db_path)
+
+
+def test_bloom_filter_hashes_whole_floats_like_ints():
+    bloom = BloomFilter(capacity=1000)
+    bloom.add(pd.Series([1, 2, 3]))
+    assert bloom.might_contain(pd.Series([1.0, 2.0, 3.0])).all()
+    assert bloom.might_contain(pd.Series([1.0, "x"], dtype=object))[0]
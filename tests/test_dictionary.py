@@ -0,0 +1,68 @@
+import pandas as pd
+
+from claims_prep import categorize_low_cardinality, connect_db, read_table
+from claims_prep.dictionary import encoded_table_name, lookup_table_name
+
+
+def _sorted(df):
+    return df.sort_values("claim_id").reset_index(drop=True)
+
+
+def _lookup_tables(db_path):
+    conn = connect_db(db_path)
+    try:
+        prefix = lookup_table_name("claims", "")
+        return sorted(r[0][len(prefix):] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                      if r[0].startswith(prefix))
+    finally:
+        conn.close()
+
+
+def test_encoded_table_reads_back_unchanged(make_claims, ingest):
+    df = make_claims(200)
+    db_path = ingest(df, dictionary_encode=True)
+
+    assert "provider_id" in _lookup_tables(db_path)
+    assert "claim_id" not in _lookup_tables(db_path)
+    conn = connect_db(db_path)
+    try:
+        stored = pd.read_sql_query(f"SELECT provider_id FROM {encoded_table_name('claims')}", conn)
+    finally:
+        conn.close()
+    assert pd.api.types.is_integer_dtype(stored["provider_id"])
+    table = _sorted(read_table(db_path, "claims"))
+    for col in ("provider_id", "patient_id", "diagnosis_code", "amount"):
+        assert table[col].tolist() == _sorted(df)[col].tolist()
+
+
+def test_append_to_encoded_table_extends_dictionaries(make_claims, ingest):
+    first, second = make_claims(200, seed=0), make_claims(100, seed=1)
+    second.loc[:10, "provider_id"] = "prov_new"
+    ingest(first, dictionary_encode=True)
+    db_path = ingest(second, if_exists="append")
+
+    expected = _sorted(pd.concat([first, second]))
+    table = _sorted(read_table(db_path, "claims"))
+    assert table["provider_id"].tolist() == expected["provider_id"].tolist()
+
+
+def test_append_keeps_columns_that_were_stored_unencoded(ingest):
+    # every state is distinct at first, so nothing is encoded; repeats in the append must not start encoding it
+    first = pd.DataFrame({"claim_id": [f"c{i}" for i in range(6)], "state": list("ABCDEF"), "amount": 1.0})
+    second = pd.DataFrame({"claim_id": [f"d{i}" for i in range(6)], "state": ["A"] * 6, "amount": 2.0})
+    ingest(first, dictionary_encode=True)
+    db_path = ingest(second, if_exists="append")
+
+    assert _lookup_tables(db_path) == []
+    table = _sorted(read_table(db_path, "claims"))
+    assert table["state"].tolist() == _sorted(pd.concat([first, second]))["state"].tolist()
+
+
+def test_categorize_low_cardinality_converts_repeated_strings_only(make_claims):
+    df = make_claims(200)
+    out = categorize_low_cardinality(df.copy(), exclude=["patient_id"])
+
+    assert isinstance(out["provider_id"].dtype, pd.CategoricalDtype)
+    assert not isinstance(out["claim_id"].dtype, pd.CategoricalDtype)
+    assert not isinstance(out["patient_id"].dtype, pd.CategoricalDtype)
+    assert out["provider_id"].astype(str).tolist() == df["provider_id"].tolist()
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from claims_prep import categorize_low_cardinality, create_fraud_features
+from claims_prep import features
+
+
+@pytest.fixture
+def claims(make_claims):
+    df = make_claims(3000, seed=0)
+    rng = np.random.default_rng(1)
+    df.loc[rng.random(len(df)) < 0.02, "patient_id"] = None
+    df.loc[rng.random(len(df)) < 0.02, "provider_id"] = None
+    # shuffled, non-default index: the parallel path must restore the serial row order and labels
+    return df.sample(frac=1, random_state=1).set_axis(rng.permutation(len(df)) * 3 + 7)
+
+
+@pytest.fixture(autouse=True)
+def _parallel_threshold(monkeypatch):
+    monkeypatch.setattr(features, "_MIN_PARALLEL_ROWS", 0)
+
+
+def _assert_same_as_serial(df, **kwargs):
+    serial = create_fraud_features(df, **kwargs)
+    parallel = create_fraud_features(df, n_jobs=3, **kwargs)
+    # provider partial sums are added in a different order, so only those may differ in the last bits
+    inexact = ["provider_total_amount", "provider_mean_amount"]
+    pd.testing.assert_frame_equal(serial.drop(columns=inexact), parallel.drop(columns=inexact))
+    pd.testing.assert_frame_equal(serial[inexact], parallel[inexact], check_exact=False, rtol=1e-12)
+
+
+def test_parallel_features_match_serial(claims):
+    _assert_same_as_serial(claims)
+
+
+def test_parallel_features_match_serial_with_categorical_ids(claims):
+    _assert_same_as_serial(categorize_low_cardinality(claims))
+
+
+def test_parallel_features_match_serial_without_dates(claims):
+    _assert_same_as_serial(claims.drop(columns=["claim_date"]))
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from claims_prep import DatasetWriter, save_dataset
+
+pytest.importorskip("pyarrow")
+
+
+def _read_partitioned(path, fmt):
+    import pyarrow.dataset as ds
+
+    table = ds.dataset(path, format="ipc" if fmt == "feather" else fmt, partitioning="hive").to_table()
+    return table.to_pandas()
+
+
+def _sorted(df, columns):
+    return df[columns].sort_values("claim_id").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_partitions_survive_closing_writers(tmp_path, make_claims, fmt):
+    df = make_claims(600)
+    df["provider_id"] = [f"prov{i % 40}" for i in range(len(df))]
+    out = tmp_path / "out"
+    with DatasetWriter(out, fmt=fmt, partition_by="provider", max_open_files=4) as writer:
+        for start in range(0, len(df), 50):
+            writer.write(df.iloc[start:start + 50])
+        assert len(writer._writers) <= 4
+
+    assert len(list(out.iterdir())) == 40
+    assert len(list(out.glob(f"*/part-00001.{fmt}"))) > 0
+    back = _read_partitioned(out, fmt)
+    back["provider_id"] = back["provider_id"].astype(str)
+    columns = ["claim_id", "provider_id", "amount"]
+    pd.testing.assert_frame_equal(_sorted(back, columns), _sorted(df, columns))
+
+
+def test_partitioned_csv_round_trip(tmp_path, make_claims):
+    df = make_claims(300)
+    out = save_dataset(df, tmp_path / "claims.csv", partition_by="claim_month", row_group_size=40)
+
+    months = sorted(p.name for p in out.iterdir())
+    assert months == [f"claim_month=2021-{m:02d}" for m in range(1, 7)]
+    back = pd.concat(pd.read_csv(f) for f in out.glob("*/part-*.csv"))
+    columns = ["claim_id", "patient_id", "amount"]
+    pd.testing.assert_frame_equal(_sorted(back, columns), _sorted(df, columns))
+
+
+def test_partitioned_rerun_replaces_previous_output(tmp_path, make_claims):
+    df = make_claims(300)
+    out = save_dataset(df, tmp_path / "claims.csv", fmt="parquet", partition_by="claim_month")
+    assert out == tmp_path / "claims.parquet"
+
+    march = df[df["claim_date"].dt.month == 3]
+    save_dataset(march, out, fmt="parquet", partition_by="claim_month")
+
+    assert [p.name for p in out.iterdir()] == ["claim_month=2021-03"]
+    assert len(_read_partitioned(out, "parquet")) == len(march)
+
+
+def test_partitioned_write_refuses_unrelated_directory(tmp_path, make_claims):
+    (tmp_path / "notes.txt").write_text("keep me")
+    with pytest.raises(ValueError, match="Refusing to overwrite"):
+        save_dataset(make_claims(50), tmp_path, fmt="parquet", partition_by="provider")
+    assert (tmp_path / "notes.txt").read_text() == "keep me"
+
+
+def test_unpartitioned_parquet_widens_downcast_chunks(tmp_path):
+    out = tmp_path / "claims.parquet"
+    with DatasetWriter(out, fmt="parquet") as writer:
+        writer.write(pd.DataFrame({"units": pd.Series([1, 2], dtype="int8"), "note": [None, None]}))
+        writer.write(pd.DataFrame({"units": pd.Series([300], dtype="int16"), "note": ["x"]}))
+
+    back = pd.read_parquet(out)
+    assert back["units"].tolist() == [1, 2, 300]
+    assert back["note"].tolist()[2] == "x"
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from claims_prep import connect_db
+from claims_prep.rollups import find_rollup, read_rollup
+
+
+def _assert_rollups_match_group_by(db_path):
+    conn = connect_db(db_path)
+    try:
+        table = pd.read_sql_query("SELECT * FROM claims", conn)
+        table["claim_month"] = pd.to_datetime(table["claim_date"]).dt.strftime("%Y-%m")
+        for dimension, key in [("provider", "provider_id"), ("patient", "patient_id"),
+                               ("diagnosis", "diagnosis_code"), ("claim_month", "claim_month")]:
+            found = find_rollup(conn, "claims", dimension)
+            assert found is not None, dimension
+            rollup = read_rollup(conn, *found).set_index(key)
+            grouped = table.groupby(key)["amount"].agg(["count", "sum", "mean"])
+            assert rollup["count"].to_dict() == grouped["count"].to_dict()
+            assert rollup["total"].to_dict() == pytest.approx(grouped["sum"].to_dict())
+            assert rollup["mean"].to_dict() == pytest.approx(grouped["mean"].to_dict())
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("dictionary_encode", [False, True])
+def test_rollups_match_group_by_after_appends(make_claims, ingest, dictionary_encode):
+    ingest(make_claims(150, seed=0), chunk_size=40, build_rollups=True, dictionary_encode=dictionary_encode)
+    db_path = ingest(make_claims(90, seed=1), chunk_size=40, build_rollups=True, if_exists="append")
+    _assert_rollups_match_group_by(db_path)
+
+
+@pytest.mark.parametrize("dictionary_encode", [False, True])
+def test_append_backfills_missing_rollups_from_existing_rows(make_claims, ingest, dictionary_encode):
+    ingest(make_claims(150, seed=0), chunk_size=40, dictionary_encode=dictionary_encode)
+    db_path = ingest(make_claims(90, seed=1), chunk_size=40, build_rollups=True, if_exists="append")
+    _assert_rollups_match_group_by(db_path)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from claims_prep import FeatureService, build_feature_tables, create_fraud_features, create_sqlite_db_from_dir, read_table
+from claims_prep.service import _serve_connection
+
+SAMPLE_DIR = Path(__file__).resolve().parents[1] / "data" / "sample_small"
+
+
+@pytest.fixture
+def sample_db(tmp_path):
+    data_dir = tmp_path / "sample_small"
+    shutil.copytree(SAMPLE_DIR, data_dir)
+    db_path = tmp_path / "sample_small.db"
+    create_sqlite_db_from_dir(data_dir, db_path)
+    return db_path
+
+
+def test_feature_tables_match_create_fraud_features(sample_db):
+    assert build_feature_tables(sample_db) == {"patient": "patient_id", "provider": "provider_id"}
+    expected = create_fraud_features(read_table(sample_db, "claims"))
+    service = FeatureService({"sample": sample_db})
+
+    found = asyncio.run(service.lookup("sample", "patient", expected["patient_id"].unique().tolist()))
+    for _, row in expected.iterrows():
+        features = found[row["patient_id"]]
+        assert features["patient_claim_count"] == row["patient_claim_count"]
+        assert features["patient_total_amount"] == pytest.approx(row["patient_total_amount"])
+        assert features["patient_std_amount"] == pytest.approx(row["patient_std_amount"])
+
+
+def test_build_feature_tables_skips_db_without_source_table(sample_db):
+    assert build_feature_tables(sample_db, table="missing") == {}
+
+
+async def _exchange(service, raw: bytes, max_body_bytes: int = 64) -> bytes:
+    server = await asyncio.start_server(lambda r, w: _serve_connection(service, r, w, max_body_bytes), "127.0.0.1", 0)
+    async with server:
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+    return response
+
+
+@pytest.mark.parametrize("length, status", [("abc", b"400"), ("-5", b"400"), ("1000", b"413")])
+def test_server_rejects_bad_or_oversized_content_length(sample_db, length, status):
+    build_feature_tables(sample_db)
+    service = FeatureService({"sample": sample_db})
+    raw = (f"POST /features/sample/patient/batch HTTP/1.1\r\nContent-Length: {length}\r\n\r\n").encode("latin-1")
+    response = asyncio.run(_exchange(service, raw))
+    assert response.startswith(b"HTTP/1.1 " + status)
+    assert b"Connection: close" in response
+
+
+def test_server_answers_batch_lookup(sample_db):
+    build_feature_tables(sample_db)
+    service = FeatureService({"sample": sample_db})
+    body = json.dumps({"ids": ["p1", "nope"]}).encode("utf-8")
+    raw = (f"POST /features/sample/patient/batch HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+           "Connection: close\r\n\r\n").encode("latin-1") + body
+    response = asyncio.run(_exchange(service, raw))
+    assert response.startswith(b"HTTP/1.1 200")
+    results = json.loads(response.split(b"\r\n\r\n", 1)[1])["results"]
+    assert results["p1"]["patient_claim_count"] >= 1
+    assert results["nope"] is None
+
+
+def test_lookup_finds_ids_stored_as_real(ingest, make_claims):
+    df = make_claims(200)
+    df["patient_id"] = [100 + i % 10 for i in range(len(df))]
+    df["patient_id"] = df["patient_id"].astype(float)
+    df.loc[0, "patient_id"] = None  # a missing ID makes the column float, stored as REAL
+    db_path = ingest(df, preprocess=False)
+    build_feature_tables(db_path)
+    service = FeatureService({"claims": db_path})
+
+    found = asyncio.run(service.lookup("claims", "patient", ["101", "101.0", "999"]))
+    count = int((df["patient_id"] == 101).sum())
+    assert found["101"]["patient_claim_count"] == count
+    assert found["101.0"]["patient_claim_count"] == count
+    assert found["999"] is None
+
+
+@pytest.mark.parametrize("if_exists", ["append", "replace"])
+def test_reingesting_rebuilds_feature_tables(ingest, make_claims, if_exists):
+    first, second = make_claims(200, seed=0), make_claims(100, seed=1)
+    db_path = ingest(first)
+    build_feature_tables(db_path)
+    ingest(second, if_exists=if_exists)
+
+    rows = second if if_exists == "replace" else pd.concat([first, second])
+    service = FeatureService({"claims": db_path})
+    found = asyncio.run(service.lookup("claims", "provider", ["prov1"]))
+    assert found["prov1"]["provider_claim_count"] == int((rows["provider_id"] == "prov1").sum())
+    assert found["prov1"]["provider_total_amount"] == pytest.approx(rows.loc[rows["provider_id"] == "prov1", "amount"].sum())
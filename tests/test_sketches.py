@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from claims_prep import load_summaries, read_table
+from claims_prep.sketches import QuantileSketch, sketch_path_for_db
+
+
+def test_append_summarizes_existing_rows_when_sketches_are_missing(make_claims, ingest):
+    ingest(make_claims(150, seed=0), chunk_size=40)
+    db_path = ingest(make_claims(90, seed=1), chunk_size=40, build_sketches=True, if_exists="append")
+
+    summary = load_summaries(sketch_path_for_db(db_path))["claims"]
+    amount = read_table(db_path, "claims")["amount"]
+    assert summary.moments.count == len(amount) == 240
+    assert summary.moments.total == pytest.approx(amount.sum())
+    assert summary.moments.std() == pytest.approx(amount.std())
+
+
+def test_quantile_sketch_merge_stays_within_rank_error():
+    values = np.random.default_rng(0).gamma(2.0, 100.0, 200_000)
+    sketch = QuantileSketch(seed=1)
+    for part in np.array_split(values, 8):
+        sketch.merge(QuantileSketch(seed=2).update(part))
+    assert sketch.count == len(values)
+    for q in (0.5, 0.9, 0.99):
+        rank = (values <= sketch.quantile(q)).mean()
+        assert abs(rank - q) < 0.01